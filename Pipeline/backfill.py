@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+import requests
+from sqlmodel import Session
+
+from Pipeline import scrape_traffic
+from Pipeline.changefeed import publish
+from Pipeline.etl_traffic import process_row
+from Pipeline.functions import (
+    ProcessData,
+    ProcessTracker,
+    bulk_verify_existence,
+    logging,
+    setup_logging,
+)
+from Pipeline.incremental import IncrementalState, split_range
+from Pipeline.migracion_hash import check_width
+from Pipeline.models import Pasajero, Proveedor
+from Pipeline.resumen import refresh_prevision
+from Pipeline.utils import Paths
+
+
+def _init_worker(base_url: str) -> None:
+    # Con fork el pool de conexiones del padre queda copiado: se descarta sin cerrarlo
+    Paths.ENGINE.dispose(close=False)
+    scrape_traffic.configure(base_url)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(processName)s - %(levelname)s - %(message)s",
+    )
+
+
+def run_shard(desde: date, hasta: date, cookies: dict, cargar: bool = True) -> dict:
+    """Scrapea, preprocesa y concilia un shard completo en su propia conexión"""
+    logger = logging.getLogger(__name__)
+    key = IncrementalState.key(desde, hasta)
+    tracker = ProcessTracker()
+
+    buffer = scrape_traffic.fetch_window(
+        requests.Session(), cookies, desde, hasta, strict=True
+    )
+    data = buffer.to_frame()
+    if data.empty:
+        return {"shard": key, "filas": 0, **tracker.stats}
+
+    df = ProcessData.preproccess_traffic(
+        data, os.path.join(Paths.BACKFILL, f"errores_{desde:%Y%m%d}.xlsx")
+    )
+    if not cargar:
+        return {"shard": key, "filas": len(df), **tracker.stats}
+
+    # Dimensiones: se resuelven bajo lock y con commit propio antes de las reservas
+    proveedores_map = bulk_verify_existence(
+        Paths.ENGINE, Proveedor, "nombre_proveedor", df["proveedor"]
+    )
+    pasajeros_map = bulk_verify_existence(
+        Paths.ENGINE, Pasajero, "nombre_pasajero", df["pasajero"]
+    )
+
+    with Session(Paths.ENGINE) as session:
+        for index, row in df.iterrows():
+            process_row(
+                session, row, proveedores_map, pasajeros_map, tracker, logger, index
+            )
+        run = refresh_prevision(session, tracker.reservas_tocadas, "backfill")
+        tracker.id_run = run.id_run
+        session.commit()
+    publish(tracker, "backfill", logger)
+    return {"shard": key, "filas": len(df), **tracker.stats}
+
+
+def load_progress(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_progress(path: str, progress: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(progress, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def main_backfill(
+    desde: date,
+    hasta: date,
+    workers: int = 4,
+    shard_dias: int = 14,
+    resume: bool = True,
+    cargar: bool = True,
+    cookies: dict | None = None,
+) -> dict:
+    """Reconstruye el histórico de [desde, hasta] en shards de fechas en paralelo.
+
+    El progreso de cada shard queda en Paths.BACKFILL/progreso.json; con
+    `resume=True` se saltean los shards que ya terminaron bien.
+    """
+    logger = setup_logging()
+    os.makedirs(Paths.BACKFILL, exist_ok=True)
+    progress_path = os.path.join(Paths.BACKFILL, "progreso.json")
+    progress = load_progress(progress_path) if resume else {}
+
+    shards = split_range(desde, hasta, shard_dias)
+    pendientes = [
+        (d, h)
+        for d, h in shards
+        if progress.get(IncrementalState.key(d, h), {}).get("estado") != "ok"
+    ]
+    logger.info(
+        f"🗂️ Backfill {desde} → {hasta}: {len(shards)} shards, {len(pendientes)} pendientes, {workers} workers"
+    )
+    if not pendientes:
+        return progress
+
+    if cargar:
+        check_width()
+    # Un solo login para todos los workers
+    cookies = cookies or scrape_traffic.login()
+    start = datetime.now()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(scrape_traffic.URL_BASE,),
+    ) as executor:
+        futures = {
+            executor.submit(run_shard, d, h, cookies, cargar): (d, h)
+            for d, h in pendientes
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            d, h = futures[future]
+            key = IncrementalState.key(d, h)
+            try:
+                result = future.result()
+                progress[key] = {"estado": "ok", "fin": datetime.now(), **result}
+                logger.info(
+                    f"✅ Shard {i}/{len(pendientes)} {key}: {result['filas']} filas | Nuevos: {result['nuevos']} | Actualizados: {result['actualizados']} | Errores: {result['errores']}"
+                )
+            except Exception as e:
+                progress[key] = {"estado": "error", "fin": datetime.now(), "error": str(e)}
+                logger.error(f"❌ Shard {i}/{len(pendientes)} {key}: {str(e)}")
+            save_progress(progress_path, progress)
+
+    fallidos = [k for k, v in progress.items() if v["estado"] != "ok"]
+    logger.info(f"⏰ Duración total: {datetime.now() - start}")
+    if fallidos:
+        logger.warning(
+            f"⚠️ {len(fallidos)} shards con error; volver a correr para reintentarlos"
+        )
+    return progress
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill histórico de traffic")
+    parser.add_argument("desde", type=date.fromisoformat)
+    parser.add_argument("hasta", type=date.fromisoformat)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--shard-dias", type=int, default=14)
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+    main_backfill(
+        args.desde,
+        args.hasta,
+        workers=args.workers,
+        shard_dias=args.shard_dias,
+        resume=not args.no_resume,
+    )
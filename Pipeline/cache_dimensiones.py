@@ -0,0 +1,143 @@
+import logging
+import os
+import pickle
+
+from sqlmodel import Session, func, select
+
+from Pipeline.models import Cuenta, Iata, Pasajero, Proveedor
+from Pipeline.utils import Paths
+
+# tabla: (modelo, campo nombre, campo id)
+TABLAS: dict = {
+    "proveedores": (Proveedor, "nombre_proveedor", "id_proveedor"),
+    "pasajeros": (Pasajero, "nombre_pasajero", "id_pasajero"),
+    "cuentas": (Cuenta, "banco", "id_cuenta"),
+    "iatas": (Iata, "codigo_iata", "codigo_iata"),
+}
+
+
+class DimensionCache:
+    """Mapas nombre→id de las dimensiones, persistidos entre corridas.
+
+    En disco se guarda un pickle con el mapa de cada tabla y la versión de la
+    tabla al momento de guardarlo: (máximo id, cantidad de filas). Al abrirlo se
+    compara contra la BDD con una sola consulta por tabla:
+      - igual: el mapa se usa tal cual;
+      - sólo se agregaron filas (crecen id y cantidad en la misma medida): se
+        traen únicamente las filas nuevas;
+      - cualquier otra cosa (borrados, ids reusados): se recarga la tabla.
+    Lo que se agrega durante la corrida queda pendiente hasta `save()`, que se
+    llama después del commit; `discard()` lo descarta si hubo rollback.
+    """
+
+    def __init__(self, path: str = Paths.CACHE_DIMENSIONES):
+        self.path = path
+        self.maps: dict = {t: {} for t in TABLAS}
+        self.versions: dict = {t: None for t in TABLAS}
+        self.pending: dict = {t: {} for t in TABLAS}
+        self.stats: dict = {t: {"hits": 0, "misses": 0} for t in TABLAS}
+
+    @classmethod
+    def open(cls, session: Session, path: str = Paths.CACHE_DIMENSIONES) -> "DimensionCache":
+        cache = cls(path)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    raw = pickle.load(f)
+                cache.maps.update(raw["maps"])
+                cache.versions.update(raw["versions"])
+            except Exception as e:
+                logging.warning(f"⚠️ Cache de dimensiones ilegible, se reconstruye: {str(e)}")
+        cache.sync(session)
+        return cache
+
+    @classmethod
+    def warm(cls, session: Session, cache: "DimensionCache | None") -> "DimensionCache":
+        """Reutiliza un cache ya cargado en memoria (revalidándolo) o abre el de disco"""
+        if cache is None:
+            return cls.open(session)
+        cache.sync(session)
+        cache.reset_stats()
+        return cache
+
+    @staticmethod
+    def _version(session: Session, tabla: str) -> tuple:
+        model, _, id_field = TABLAS[tabla]
+        pk = getattr(model, id_field)
+        return tuple(session.exec(select(func.max(pk), func.count())).one())
+
+    def _fetch(self, session: Session, tabla: str, desde=None) -> dict:
+        model, name_field, id_field = TABLAS[tabla]
+        name, pk = getattr(model, name_field), getattr(model, id_field)
+        stmt = select(name, pk)
+        if desde is not None:
+            stmt = stmt.where(pk > desde)
+        return dict(session.exec(stmt).all())
+
+    def sync(self, session: Session) -> None:
+        """Valida cada mapa contra la versión actual de su tabla"""
+        for tabla in TABLAS:
+            actual = self._version(session, tabla)
+            previa = self.versions[tabla]
+            if previa == actual:
+                continue
+            if (
+                previa is not None
+                and tabla != "iatas"
+                and previa[0] is not None
+                and actual[0] is not None
+                and actual[1] - previa[1] == actual[0] - previa[0] > 0
+            ):
+                nuevas = self._fetch(session, tabla, desde=previa[0])
+                self.maps[tabla].update(nuevas)
+                logging.info(f"🗃️ Cache {tabla}: {len(nuevas)} filas nuevas")
+            else:
+                self.maps[tabla] = self._fetch(session, tabla)
+                logging.info(f"🗃️ Cache {tabla}: recargada ({len(self.maps[tabla])} filas)")
+            self.versions[tabla] = actual
+
+    def get(self, tabla: str, name):
+        """id de `name`, o None si hay que ir a la BDD (cuenta hits/misses)"""
+        if name is None:
+            return None
+        value = self.maps[tabla].get(name)
+        if value is None:
+            value = self.pending[tabla].get(name)
+        self.stats[tabla]["hits" if value is not None else "misses"] += 1
+        return value
+
+    def put(self, tabla: str, name, value) -> None:
+        if name is not None and value is not None:
+            self.pending[tabla][name] = value
+
+    def discard(self) -> None:
+        """Olvida lo agregado en una corrida que hizo rollback"""
+        self.pending = {t: {} for t in TABLAS}
+
+    def save(self, session: Session) -> None:
+        """Incorpora lo pendiente, revalida y escribe a disco (después del commit)"""
+        for tabla in TABLAS:
+            self.maps[tabla].update(self.pending[tabla])
+        self.discard()
+        self.sync(session)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(
+                {"maps": self.maps, "versions": self.versions},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp, self.path)
+
+    def hit_rates(self) -> dict:
+        """% de aciertos por tabla (sólo tablas consultadas en la corrida)"""
+        return {
+            tabla: round(s["hits"] / (s["hits"] + s["misses"]) * 100, 2)
+            for tabla, s in self.stats.items()
+            if s["hits"] + s["misses"]
+        }
+
+    def reset_stats(self) -> None:
+        self.stats = {t: {"hits": 0, "misses": 0} for t in TABLAS}
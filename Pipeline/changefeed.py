@@ -0,0 +1,210 @@
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from Pipeline.utils import Paths
+
+
+def _default(obj):
+    # Fingerprints binarios (reservas.hash) se publican en hex
+    if isinstance(obj, bytes):
+        return obj.hex()
+    if obj != obj:  # NaT
+        return None
+    return obj.isoformat() if hasattr(obj, "isoformat") else str(obj)
+
+
+try:
+    import orjson
+    from orjson import loads
+
+    def dumps(obj) -> bytes:
+        # Las filas vienen de pandas: numpy y fechas se serializan sin convertir
+        # (orjson escribe NaN como null)
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+except ImportError:
+    import json
+    from json import loads
+
+    def _sin_nan(obj):
+        """NaN/inf → None: json los escribiría como NaN, que no es JSON válido"""
+        if isinstance(obj, float):
+            return None if math.isnan(obj) or math.isinf(obj) else obj
+        if isinstance(obj, dict):
+            return {k: _sin_nan(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [_sin_nan(v) for v in obj]
+        if hasattr(obj, "item") and not isinstance(obj, bytes):
+            return _sin_nan(obj.item())  # escalares de numpy
+        return obj
+
+    def dumps(obj) -> bytes:
+        return json.dumps(
+            _sin_nan(obj), default=_default, ensure_ascii=False, allow_nan=False
+        ).encode()
+
+
+INDICE = "index.jsonl"
+LOCK = "index.lock"
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(f) -> bool:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(f) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _try_lock(f) -> bool:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(f) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _lock(base: str, timeout: float = 30):
+    """Lock del sistema operativo (flock / msvcrt) para asignar offsets entre procesos.
+
+    Lo libera el sistema si el dueño muere, así que nunca hay que romper un
+    lock ajeno; el archivo queda en disco y se reutiliza.
+    """
+    path = os.path.join(base, LOCK)
+    limite = time.monotonic() + timeout
+    with open(path, "a+b") as f:
+        f.seek(0)
+        while not _try_lock(f):
+            if time.monotonic() > limite:
+                raise TimeoutError(f"No se pudo tomar el lock {path}")
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+def _next_offset(index_path: str) -> int:
+    """Offset siguiente a la última entrada del índice (lee sólo el final del archivo)"""
+    if not os.path.exists(index_path):
+        return 0
+    with open(index_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lineas = f.read().splitlines()
+    if not lineas:
+        return 0
+    ultima = loads(lineas[-1])
+    return ultima["offset"] + ultima["registros"]
+
+
+def write_changes(
+    changes: list,
+    proceso: str,
+    id_run: int | None,
+    base: str = Paths.CHANGEFEED,
+    now: datetime | None = None,
+) -> dict | None:
+    """Escribe los cambios de una corrida como un segmento JSONL y lo indexa.
+
+    Layout: proceso=<proceso>/fecha=YYYY-MM-DD/run_<id_run>_<offset>.jsonl.
+    Cada registro lleva un offset global y creciente; el índice (index.jsonl)
+    tiene una línea por segmento con su offset inicial y cantidad de registros.
+    El segmento se escribe antes de agregarlo al índice, así un lector nunca
+    ve una entrada sin su archivo. Se llama después del commit.
+    """
+    if not changes:
+        return None
+    now = now or datetime.now()
+    os.makedirs(base, exist_ok=True)
+    index_path = os.path.join(base, INDICE)
+
+    with _lock(base):
+        offset = _next_offset(index_path)
+        carpeta = os.path.join(f"proceso={proceso}", f"fecha={now:%Y-%m-%d}")
+        os.makedirs(os.path.join(base, carpeta), exist_ok=True)
+        segmento = os.path.join(carpeta, f"run_{id_run}_{offset:010d}.jsonl")
+
+        tmp = os.path.join(base, f"{segmento}.tmp")
+        with open(tmp, "wb") as f:
+            for i, change in enumerate(changes):
+                f.write(dumps({"offset": offset + i, "id_run": id_run, **change}))
+                f.write(b"\n")
+        os.replace(tmp, os.path.join(base, segmento))
+
+        entrada = {
+            "offset": offset,
+            "registros": len(changes),
+            "proceso": proceso,
+            "id_run": id_run,
+            "fecha": now.isoformat(timespec="seconds"),
+            "segmento": segmento.replace(os.sep, "/"),
+        }
+        with open(index_path, "ab") as f:
+            f.write(dumps(entrada) + b"\n")
+    return entrada
+
+
+def read_changes(desde: int = 0, proceso: str | None = None, base: str = Paths.CHANGEFEED):
+    """Itera los cambios con offset >= `desde`, en orden.
+
+    El consumidor guarda el último offset leído y la próxima vez pide desde
+    offset + 1; los segmentos anteriores se saltean sólo con el índice.
+    """
+    index_path = os.path.join(base, INDICE)
+    if not os.path.exists(index_path):
+        return
+    with open(index_path, "rb") as f:
+        entradas = [loads(linea) for linea in f if linea.strip()]
+
+    for entrada in entradas:
+        if entrada["offset"] + entrada["registros"] <= desde:
+            continue
+        if proceso is not None and entrada["proceso"] != proceso:
+            continue
+        with open(os.path.join(base, entrada["segmento"]), "rb") as f:
+            for linea in f:
+                change = loads(linea)
+                if change["offset"] >= desde:
+                    yield change
+
+
+def publish(tracker, proceso: str, logger: logging.Logger | None = None) -> None:
+    """Publica los cambios del tracker; si falla sólo avisa (la carga ya se commiteó)"""
+    logger = logger or logging.getLogger(__name__)
+    try:
+        entrada = write_changes(tracker.changes, proceso, tracker.id_run)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo escribir el changefeed: {str(e)}")
+        return
+    if entrada:
+        logger.info(
+            f"📰 Changefeed: {entrada['registros']} cambios desde el offset {entrada['offset']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lee el changefeed desde un offset")
+    parser.add_argument("--desde", type=int, default=0)
+    parser.add_argument("--proceso", choices=["traffic", "excel", "backfill"])
+    args = parser.parse_args()
+    for change in read_changes(args.desde, args.proceso):
+        sys.stdout.buffer.write(dumps(change) + b"\n")
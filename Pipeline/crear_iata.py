@@ -1,6 +1,6 @@
-import pandas as pd
-from models import Iata
-from sqlmodel import Session
-from Pipeline.functions import *
-from ProcesarPipeline.utils import Paths
+from Pipeline.referencias import init_iatas
+from Pipeline.functions import setup_logging
 
+if __name__ == "__main__":
+    setup_logging()
+    init_iatas()
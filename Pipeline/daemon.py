@@ -0,0 +1,284 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+from sqlmodel import Session, text
+
+from Pipeline import scrape_traffic
+from Pipeline.cache_dimensiones import DimensionCache
+from Pipeline.etl_excel import main_excel
+from Pipeline.etl_traffic import main_traffic
+from Pipeline.functions import setup_logging
+from Pipeline.retencion import archive
+from Pipeline.utils import Paths
+
+PUERTO = 8799
+# Segundos hasta reintentar un job programado que encontró el pipeline ocupado
+REINTENTO_SEG = 30
+
+# Lo mismo que corre el daemon, pero en un intérprete nuevo: imports, pool de
+# conexiones, cache de dimensiones y login de traffic desde cero
+ARRANQUE_FRIO = {
+    "traffic": "from Pipeline.etl_traffic import main_traffic; main_traffic(incremental=True)",
+    "excel": "from Pipeline.etl_excel import main_excel; main_excel()",
+    "full": (
+        "from Pipeline.etl_traffic import main_traffic; from Pipeline.etl_excel import main_excel; "
+        "main_traffic(incremental=True); main_excel()"
+    ),
+    "retencion": "from Pipeline.retencion import archive; archive()",
+}
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class WarmPipeline:
+    """Estado caliente que se reutiliza entre corridas del daemon.
+
+    Mantiene el pool de conexiones, el cache de dimensiones en memoria y la
+    sesión HTTP autenticada con traffic. Un único lock impide que dos corridas
+    se pisen (programadas o pedidas por socket).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dim_cache: DimensionCache | None = None
+        self.http_session: requests.Session | None = None
+        self.cookies: dict | None = None
+        self.history: list = []
+        self.running: str | None = None
+
+    def warm_up(self) -> None:
+        """Abre conexiones y carga caches antes de la primera corrida"""
+        start = time.perf_counter()
+        with Session(Paths.ENGINE) as session:
+            session.exec(text("SELECT 1"))
+            self.dim_cache = DimensionCache.open(session)
+        logging.info(f"🔥 Pool y cache de dimensiones listos en {time.perf_counter() - start:.2f} s")
+
+    def ensure_login(self) -> None:
+        """Reutiliza las cookies mientras traffic las acepte; si no, vuelve a entrar"""
+        if self.cookies and scrape_traffic.session_alive(self.http_session, self.cookies):
+            return
+        logging.info("🔑 Sesión de traffic vencida o inexistente, ingresando...")
+        self.http_session = requests.Session()
+        self.cookies = scrape_traffic.login(self.http_session)
+
+    def _traffic(self) -> None:
+        self.ensure_login()
+        main_traffic(
+            incremental=True,
+            dim_cache=self.dim_cache,
+            cookies=self.cookies,
+            http_session=self.http_session,
+        )
+
+    def _excel(self) -> None:
+        main_excel(dim_cache=self.dim_cache)
+
+    def _retencion(self) -> None:
+        archive()
+
+    def _full(self) -> None:
+        self._traffic()
+        self._excel()
+
+    def run(self, job: str) -> dict:
+        """Corre `job` si no hay otra corrida en curso; devuelve el resultado"""
+        jobs = {
+            "traffic": self._traffic,
+            "excel": self._excel,
+            "full": self._full,
+            "retencion": self._retencion,
+        }
+        if job not in jobs:
+            return {"ok": False, "error": f"job desconocido: {job}"}
+        if not self.lock.acquire(blocking=False):
+            logging.warning(f"⏳ {job} no arrancó: {self.running} todavía en curso")
+            return {"ok": False, "ocupado": True, "error": f"ocupado ({self.running})"}
+
+        # La primera corrida de cada job dentro del daemon (pool ya abierto,
+        # pero sin login ni imports perezosos); el arranque en frío real lo
+        # mide cold_start
+        primera = not any(h["job"] == job for h in self.history)
+        self.running = job
+        inicio = datetime.now()
+        start = time.perf_counter()
+        try:
+            jobs[job]()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+            logging.error(f"❌ {job} falló: {error}")
+        finally:
+            self.running = None
+            self.lock.release()
+
+        result = {
+            "job": job,
+            "ok": ok,
+            "error": error,
+            "inicio": inicio.isoformat(timespec="seconds"),
+            "segundos": round(time.perf_counter() - start, 2),
+            "primera": primera,
+        }
+        self.history.append(result)
+        logging.info(
+            f"⏱️ {job} {'primera corrida' if primera else 'caliente'}: {result['segundos']} s"
+        )
+        return result
+
+    def status(self) -> dict:
+        """Latencia por job: primera corrida en el daemon vs promedio de las calientes"""
+        resumen = {}
+        for job in {h["job"] for h in self.history}:
+            runs = [h for h in self.history if h["job"] == job and h["ok"]]
+            warm = [h["segundos"] for h in runs if not h["primera"]]
+            resumen[job] = {
+                "corridas": len(runs),
+                "primera": next((h["segundos"] for h in runs if h["primera"]), None),
+                "caliente_promedio": round(sum(warm) / len(warm), 2) if warm else None,
+                "ultima": runs[-1] if runs else None,
+            }
+        return {"en_curso": self.running, "jobs": resumen}
+
+
+def cold_start(job: str) -> dict:
+    """Corre `job` en un proceso nuevo y mide el tiempo de punta a punta"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", ARRANQUE_FRIO[job]],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    return {
+        "job": job,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "segundos": round(time.perf_counter() - start, 2),
+    }
+
+
+def bench(job: str, repeticiones: int = 3, puerto: int = PUERTO) -> dict:
+    """Arranque en frío (subprocess) vs corrida caliente en un daemon ya levantado"""
+    frio = [cold_start(job) for _ in range(repeticiones)]
+    caliente = [send(job, puerto) for _ in range(repeticiones)]
+    for nombre, runs in (("frío", frio), ("caliente", caliente)):
+        fallidas = [r["error"] for r in runs if not r["ok"]]
+        if fallidas:
+            raise RuntimeError(f"{job} {nombre} falló: {fallidas[0]}")
+
+    def mediana(runs):
+        return sorted(r["segundos"] for r in runs)[len(runs) // 2]
+
+    resultado = {"job": job, "frio": mediana(frio), "caliente": mediana(caliente)}
+    resultado["ahorro"] = round(resultado["frio"] - resultado["caliente"], 2)
+    return resultado
+
+
+class Scheduler(threading.Thread):
+    """Dispara cada job cada `intervalos[job]` minutos (0 = sólo a pedido).
+
+    Si el pipeline está ocupado (p. ej. con una corrida pedida por socket) el
+    job no se pierde: se reintenta a los REINTENTO_SEG segundos.
+    """
+
+    def __init__(self, pipeline: WarmPipeline, intervalos: dict):
+        super().__init__(daemon=True)
+        self.pipeline = pipeline
+        self.intervalos = {j: m * 60 for j, m in intervalos.items() if m}
+        self.proximo = {j: time.monotonic() for j in self.intervalos}
+        self.stop = threading.Event()
+
+    def run(self) -> None:
+        while not self.stop.wait(1):
+            for job, intervalo in self.intervalos.items():
+                if time.monotonic() >= self.proximo[job]:
+                    result = self.pipeline.run(job)
+                    if result.get("ocupado"):
+                        logging.info(f"🔁 {job} se reintenta en {REINTENTO_SEG} s")
+                        self.proximo[job] = time.monotonic() + REINTENTO_SEG
+                    else:
+                        self.proximo[job] = time.monotonic() + intervalo
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    """Una línea por comando: traffic | excel | full | retencion | status | stop"""
+
+    pipeline: WarmPipeline
+
+    def handle(self) -> None:
+        comando = self.rfile.readline().decode().strip()
+        if comando == "status":
+            respuesta = self.pipeline.status()
+        elif comando == "stop":
+            respuesta = {"ok": True}
+            threading.Thread(target=self.server.shutdown).start()
+        else:
+            respuesta = self.pipeline.run(comando)
+        self.wfile.write((json.dumps(respuesta, default=str) + "\n").encode())
+
+
+def serve(puerto: int = PUERTO, intervalos: dict | None = None) -> None:
+    setup_logging()
+    pipeline = WarmPipeline()
+    pipeline.warm_up()
+
+    scheduler = Scheduler(pipeline, intervalos or {})
+    scheduler.start()
+
+    handler = type("Handler", (CommandHandler,), {"pipeline": pipeline})
+    # Sólo localhost: el socket no tiene autenticación
+    with socketserver.ThreadingTCPServer(("127.0.0.1", puerto), handler) as server:
+        logging.info(f"🛰️ Daemon escuchando en 127.0.0.1:{puerto}")
+        server.serve_forever()
+    scheduler.stop.set()
+
+
+def send(comando: str, puerto: int = PUERTO) -> dict:
+    """Cliente: manda un comando al daemon y espera la respuesta"""
+    with socket.create_connection(("127.0.0.1", puerto)) as conn:
+        conn.sendall(f"{comando}\n".encode())
+        return json.loads(conn.makefile().readline())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline en modo daemon")
+    sub = parser.add_subparsers(dest="accion", required=True)
+    srv = sub.add_parser("serve")
+    srv.add_argument("--puerto", type=int, default=PUERTO)
+    srv.add_argument("--traffic-cada", type=int, default=60, help="minutos, 0 = nunca")
+    srv.add_argument("--excel-cada", type=int, default=0, help="minutos, 0 = nunca")
+    srv.add_argument("--retencion-cada", type=int, default=24 * 60, help="minutos, 0 = nunca")
+    cli = sub.add_parser("send")
+    cli.add_argument(
+        "comando", choices=["traffic", "excel", "full", "retencion", "status", "stop"]
+    )
+    cli.add_argument("--puerto", type=int, default=PUERTO)
+    medir = sub.add_parser("bench", help="arranque en frío vs daemon caliente")
+    medir.add_argument("job", choices=list(ARRANQUE_FRIO))
+    medir.add_argument("--repeticiones", type=int, default=3)
+    medir.add_argument("--puerto", type=int, default=PUERTO)
+    args = parser.parse_args()
+
+    if args.accion == "serve":
+        serve(
+            args.puerto,
+            {
+                "traffic": args.traffic_cada,
+                "excel": args.excel_cada,
+                "retencion": args.retencion_cada,
+            },
+        )
+    elif args.accion == "bench":
+        print(json.dumps(bench(args.job, args.repeticiones, args.puerto), indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(send(args.comando, args.puerto), indent=2, ensure_ascii=False))
@@ -1,5 +1,5 @@
 import pandas as pd
-from Pipeline.models import Saldo, Cuenta, Reserva
+from Pipeline.models import Saldo, SaldoHist, Cuenta, Reserva, ReservaHist
 from sqlmodel import Session, select
 from Pipeline.functions import (
     setup_logging,
@@ -7,9 +7,28 @@ from Pipeline.functions import (
     ProcessData,
     ProcessTracker,
 )
+from Pipeline.cache_dimensiones import DimensionCache
+from Pipeline.changefeed import publish
+from Pipeline.resumen import refresh_prevision
 from Pipeline.utils import Paths
 import os, logging
 
+# Campos del saldo que se comparan contra la BDD
+CAMPOS_SALDO: list = [
+    "codigo_transferencia",
+    "tipo_movimiento",
+    "fecha_pago",
+    "descripcion",
+    "moneda_pago",
+    "monto",
+    "tipo_de_cambio",
+    "comision",
+    "impuesto",
+    "estado_pago",
+    "tipo_de_saldo",
+    "id_cuenta",
+]
+
 
 def process_row(
     session: Session,
@@ -17,12 +36,18 @@ def process_row(
     tracker: ProcessTracker,
     logger: logging.Logger,
     row_index: int,
+    cache: DimensionCache | None = None,
 ) -> None:
     # file_code = id_saldo
     file_code = row.get("id_saldo", f"ROW_{row_index}")
     try:
         tracker.increment_processed()
-        banco: Cuenta = verify_existence(session, Cuenta, "banco", row["banco"])
+        id_cuenta = cache.get("cuentas", row["banco"]) if cache else None
+        if id_cuenta is None:
+            banco: Cuenta = verify_existence(session, Cuenta, "banco", row["banco"])
+            id_cuenta = banco.id_cuenta if banco else None
+            if cache:
+                cache.put("cuentas", row["banco"], id_cuenta)
         verify_saldo: Saldo = session.exec(
             select(Saldo).where(Saldo.id_reserva == row["id_reserva"])
         ).first()
@@ -39,7 +64,7 @@ def process_row(
             "estado_pago": row.get("estado_pago"),
             "tipo_de_saldo": row.get("tipo_de_saldo"),
             "id_reserva": None,
-            "id_cuenta": banco.id_cuenta if banco else None,
+            "id_cuenta": id_cuenta,
         }
 
         if not verify_saldo:
@@ -50,31 +75,36 @@ def process_row(
                 create_dic["id_reserva"] = reserva.id_reserva
                 nueva = Saldo(**create_dic)
                 session.add(nueva)
+                session.flush()  # id_saldo para el changefeed
                 tracker.add_new(file_code, row)
+                tracker.add_change(
+                    "insert", "saldos", reserva.id_reserva, create_dic, id_saldo=nueva.id_saldo
+                )
+                tracker.touch(reserva.id_reserva)
                 logger.info(
                     f"✨ NUEVO: id_reserva={row['id_reserva']} - Banco: {row.get('banco')}"
                 )
+            elif session.get(ReservaHist, row["id_reserva"]):
+                # Reserva archivada por la retención: sus saldos ya están en saldos_hist
+                # y no se tocan. Si el Excel trae otros valores se reporta.
+                archivado: SaldoHist = session.exec(
+                    select(SaldoHist).where(SaldoHist.id_reserva == row["id_reserva"])
+                ).first()
+                if archivado and all(
+                    create_dic[k] == getattr(archivado, k) for k in CAMPOS_SALDO
+                ):
+                    tracker.add_no_change()
+                else:
+                    msg = f"Reserva {row['id_reserva']} archivada: el saldo editado no se aplica"
+                    tracker.add_archived(file_code, row, msg)
+                    logger.warning(f"🗄️ {msg}")
             else:
                 msg = f"Reserva {row['id_reserva']} no existe en la tabla Reserva"
                 tracker.add_error(file_code, row, msg)
                 logger.warning(f"⚠️ {msg}")
         else:
             changed_fields: list = []
-            items: list = [
-                "codigo_transferencia",
-                "tipo_movimiento",
-                "fecha_pago",
-                "descripcion",
-                "moneda_pago",
-                "monto",
-                "tipo_de_cambio",
-                "comision",
-                "impuesto",
-                "estado_pago",
-                "tipo_de_saldo",
-                "id_cuenta",
-            ]
-            for key in items:
+            for key in CAMPOS_SALDO:
                 value = create_dic.get(key)
                 current = getattr(verify_saldo, key)
 
@@ -85,6 +115,14 @@ def process_row(
             if changed_fields:
                 session.add(verify_saldo)
                 tracker.add_update(file_code, row, changed_fields)
+                tracker.add_change(
+                    "update",
+                    "saldos",
+                    verify_saldo.id_reserva,
+                    {k: create_dic[k] for k in changed_fields},
+                    id_saldo=verify_saldo.id_saldo,
+                )
+                tracker.touch(verify_saldo.id_reserva)
                 logger.info(
                     f"📝 ACTUALIZADO: id_reserva={row['id_reserva']} - Campos: {', '.join(changed_fields)}"
                 )
@@ -98,39 +136,61 @@ def process_row(
         logger.error(f"❌ {msg}")
 
 
-def main_excel():
+def read_prevision(path: str = Paths.PREVISION) -> pd.DataFrame:
+    """Lee y preprocesa PREVISION.xlsx (no toca la BDD)"""
+    logger = logging.getLogger(__name__)
+    logger.info(f"📁 Leyendo archivo: {path}")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Archivo no encontrado: {path}")
+
+    df = pd.read_excel(path, engine="openpyxl")
+    logger.info(f"📊 Archivo leído exitosamente: {len(df)} filas encontradas")
+    logger.info("🔄 Iniciando preprocesamiento...")
+    df_original_count = len(df)
+    df = ProcessData.preproccess_prev(df)
+    logger.info(
+        f"✅ Preprocesamiento completado: {len(df)} filas válidas (eliminadas: {df_original_count - len(df)})"
+    )
+    return df
+
+
+def main_excel(
+    df: pd.DataFrame | None = None, dim_cache: DimensionCache | None = None
+):
+    """Carga los saldos; con `df` se usa ese workbook ya leído por read_prevision"""
     logger = setup_logging()
     tracker = ProcessTracker()
+    cache = None
     try:
-        logger.info(f"📁 Leyendo archivo: {Paths.PREVISION}")
-        if not os.path.exists(Paths.PREVISION):
-            raise FileNotFoundError(f"Archivo no encontrado: {Paths.PREVISION}")
-
-        df = pd.read_excel(Paths.PREVISION, engine="openpyxl")
-        logger.info(f"📊 Archivo leído exitosamente: {len(df)} filas encontradas")
-        logger.info("🔄 Iniciando preprocesamiento...")
-        df_original_count = len(df)
-        df = ProcessData.preproccess_prev(df)
-        logger.info(
-            f"✅ Preprocesamiento completado: {len(df)} filas válidas (eliminadas: {df_original_count - len(df)})"
-        )
+        if df is None:
+            df = read_prevision()
         with Session(Paths.ENGINE) as session:
+            cache = DimensionCache.warm(session, dim_cache)
             logger.info("🚀 Iniciando procesamiento de saldos...")
             for index, row in df.iterrows():
-                process_row(session, row, tracker, logger, index)
+                process_row(session, row, tracker, logger, index, cache)
                 if (index + 1) % 100 == 0:
                     stats = tracker.stats
                     logger.info(
                         f"📈 Progreso: {index+1}/{len(df)} | Nuevos: {stats['nuevos']} | Actualizados: {stats['actualizados']} | Errores: {stats['errores']}"
                     )
+            run = refresh_prevision(session, tracker.reservas_tocadas, "excel")
+            tracker.id_run = run.id_run
+            logger.info(
+                f"🧮 gabi_prevision refrescada: {len(tracker.reservas_tocadas)} reservas (run {run.id_run})"
+            )
             logger.info("💾 Realizando commit final...")
             session.commit()
             logger.info("✅ Commit exitoso")
+            cache.save(session)
+            publish(tracker, "excel", logger)
     except Exception as e:
         logger.error(f"❌ ERROR CRÍTICO: {str(e)}")
         if "session" in locals():
             session.rollback()
             logger.info("🔄 Rollback realizado")
+        if cache is not None:
+            cache.discard()
         raise
     finally:
         logger.info("📋 Generando reportes finales...")
@@ -143,8 +203,12 @@ def main_excel():
         logger.info(f"✨ Nuevos registros: {summary['stats']['nuevos']}")
         logger.info(f"📝 Registros actualizados: {summary['stats']['actualizados']}")
         logger.info(f"⚪ Sin cambios: {summary['stats']['sin_cambios']}")
+        logger.info(f"🗄️ Archivados (no se modifican): {summary['stats']['archivados']}")
         logger.info(f"❌ Errores: {summary['stats']['errores']}")
         logger.info(f"📊 Tasa de éxito: {summary['tasa_exito']}%")
+        if cache is not None:
+            for tabla, tasa in cache.hit_rates().items():
+                logger.info(f"🗃️ Cache {tabla}: {tasa}% de aciertos")
         logger.info("=" * 60)
         logger.info("✅ PROCESO COMPLETADO")
         logger.info("=" * 60)
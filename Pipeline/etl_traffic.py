@@ -1,5 +1,6 @@
 import pandas as pd
-from Pipeline.models import Proveedor, Pasajero, Reserva, Iata
+from datetime import datetime
+from Pipeline.models import Proveedor, Pasajero, Reserva, ReservaHist, Iata
 from sqlmodel import Session, and_, select
 from Pipeline.functions import (
     ProcessData,
@@ -8,11 +9,22 @@ from Pipeline.functions import (
     setup_logging,
     verify_existence,
 )
+from Pipeline.cache_dimensiones import DimensionCache
+from Pipeline.incremental import IncrementalState
+from Pipeline.migracion_hash import check_width
+from Pipeline.changefeed import publish
+from Pipeline.resumen import refresh_prevision
 from Pipeline.scrape_traffic import main_scraper
+from Pipeline.snapshots import load_snapshot, save_snapshot
 from Pipeline.utils import Paths
 
 
-def bulk_prov(df: pd.DataFrame, session: Session, logger: logging.Logger) -> dict:
+def bulk_prov(
+    df: pd.DataFrame,
+    session: Session,
+    logger: logging.Logger,
+    cache: DimensionCache | None = None,
+) -> dict:
     """Carga provededores con logging"""
     logger.info("🏢 Iniciando carga de proveedores...")
     proveedores_map = {}
@@ -20,8 +32,14 @@ def bulk_prov(df: pd.DataFrame, session: Session, logger: logging.Logger) -> dic
     logger.info(f"   Proveedores únicos encontrados: {len(unique_proveedores)}")
     for i, nombre in enumerate(unique_proveedores, 1):
         try:
+            cached = cache.get("proveedores", nombre) if cache else None
+            if cached is not None:
+                proveedores_map[nombre] = cached
+                continue
             obj = verify_existence(session, Proveedor, "nombre_proveedor", nombre)
             proveedores_map[nombre] = obj.id_proveedor
+            if cache:
+                cache.put("proveedores", nombre, obj.id_proveedor)
             if i % 10 == 0:
                 logger.info(f"   Procesados {i}/{len(unique_proveedores)} proveedores")
         except Exception as e:
@@ -31,7 +49,12 @@ def bulk_prov(df: pd.DataFrame, session: Session, logger: logging.Logger) -> dic
     return proveedores_map
 
 
-def bulk_pass(df: pd.DataFrame, session: Session, logger: logging.Logger) -> dict:
+def bulk_pass(
+    df: pd.DataFrame,
+    session: Session,
+    logger: logging.Logger,
+    cache: DimensionCache | None = None,
+) -> dict:
     logger.info("👥 Iniciando carga de pasajeros...")
     pasajeros_map = {}
     unique_pasajeros = df["pasajero"].dropna().unique()
@@ -39,8 +62,14 @@ def bulk_pass(df: pd.DataFrame, session: Session, logger: logging.Logger) -> dic
 
     for i, nombre in enumerate(unique_pasajeros, 1):
         try:
+            cached = cache.get("pasajeros", nombre) if cache else None
+            if cached is not None:
+                pasajeros_map[nombre] = cached
+                continue
             obj = verify_existence(session, Pasajero, "nombre_pasajero", nombre)
             pasajeros_map[nombre] = obj.id_pasajero
+            if cache:
+                cache.put("pasajeros", nombre, obj.id_pasajero)
             if i % 50 == 0:
                 logger.info(f"   Procesados {i}/{len(unique_pasajeros)} pasajeros")
         except Exception as e:
@@ -50,6 +79,25 @@ def bulk_pass(df: pd.DataFrame, session: Session, logger: logging.Logger) -> dic
     return pasajeros_map
 
 
+# Clave lógica de la reserva: los mismos campos que ProcessData.hash_row, con
+# proveedor y pasajero por id
+CLAVE_LOGICA = [
+    "file",
+    "moneda",
+    "fecha_in",
+    "fecha_out",
+    "fecha_sal",
+    "id_proveedor",
+    "id_pasajero",
+    "codigo_iata",
+]
+
+
+def same_key(reserva: Reserva, create_dic: dict) -> bool:
+    """Para digests truncados: el hash coincide, ¿coincide también la clave lógica?"""
+    return all(getattr(reserva, c) == create_dic[c] for c in CLAVE_LOGICA)
+
+
 # se lee el df y procesa cada fila individualemnte, esta funcion recibe la fila desde iterrows()
 def process_row(
     session: Session,
@@ -59,10 +107,11 @@ def process_row(
     tracker: ProcessTracker,
     logger: logging.Logger,
     row_index: int,
+    cache: DimensionCache | None = None,
 ) -> None:
     """Procesa una fila con tracking detallado"""
     file_code = row.get("file", f"ROW_{row_index}")
-    row_hash: str = ProcessData.hash_row(row)
+    row_hash: bytes = ProcessData.hash_row(row)
     try:
         tracker.increment_processed()
 
@@ -70,7 +119,11 @@ def process_row(
         codigo_iata_valido = None
 
         if codigo_iata and pd.notna(codigo_iata):
-            exist = verify_existence(session, Iata, "codigo_iata", codigo_iata)
+            exist = cache.get("iatas", codigo_iata) if cache else None
+            if exist is None:
+                exist = verify_existence(session, Iata, "codigo_iata", codigo_iata)
+                if exist and cache:
+                    cache.put("iatas", codigo_iata, exist.codigo_iata)
             if exist:
                 codigo_iata_valido = codigo_iata
             else:
@@ -98,22 +151,32 @@ def process_row(
         }
 
         result = session.exec(select(Reserva).where(Reserva.hash == row_hash)).first()
+        # Una reserva que la retención ya movió a reservas_hist no se vuelve a
+        # insertar (p. ej. un backfill sobre un rango archivado)
+        archivada = (
+            None
+            if result
+            else session.exec(select(ReservaHist).where(ReservaHist.hash == row_hash)).first()
+        )
+        existente = result or archivada
 
-        if result:
+        if existente and Paths.HASH_BYTES < 32 and not same_key(existente, create_dic):
+            # Digest truncado: el hash coincide pero la clave lógica no
+            msg = f"Colisión de hash con la reserva {existente.id_reserva}"
+            logger.error(f"❌ {file_code}: {msg}")
+            tracker.add_error(file_code, row, msg)
+
+        elif result:
             # Ya existe exactamente esa fila → nada que hacer
             tracker.add_no_change()
 
+        elif archivada:
+            tracker.add_archived(
+                file_code, row, f"Reserva {archivada.id_reserva} archivada: no se modifica"
+            )
+
         else:
-            conditions = [
-                Reserva.file == row.get("file"),
-                Reserva.moneda == create_dic["moneda"],
-                Reserva.fecha_in == create_dic["fecha_in"],
-                Reserva.fecha_out == create_dic["fecha_out"],
-                Reserva.fecha_sal == create_dic["fecha_sal"],
-                Reserva.id_proveedor == create_dic["id_proveedor"],
-                Reserva.id_pasajero == create_dic["id_pasajero"],
-                Reserva.codigo_iata == create_dic["codigo_iata"],
-            ]
+            conditions = [getattr(Reserva, c) == create_dic[c] for c in CLAVE_LOGICA]
             # Buscar por clave lógica
             exist = session.exec(select(Reserva).where(and_(*conditions))).first()
 
@@ -124,6 +187,8 @@ def process_row(
                     exist.estado = new_estado
                     session.add(exist)
                     tracker.add_update(file_code, row, ["estado"])
+                    tracker.add_change("update", "reservas", exist.id_reserva, {"estado": new_estado})
+                    tracker.touch(exist.id_reserva)
                     logger.info(f"📝 ESTADO ACTUALIZADO: {file_code} → {new_estado}")
                 else:
                     tracker.add_no_change()
@@ -133,6 +198,8 @@ def process_row(
                 session.add(new_reserva)
                 session.flush()
                 tracker.add_new(file_code, row)
+                tracker.add_change("insert", "reservas", new_reserva.id_reserva, create_dic)
+                tracker.touch(new_reserva.id_reserva)
                 logger.info(f"✨ NUEVO: {file_code} (ID: {new_reserva.id_reserva})")
     except Exception as e:
         error_msg = f"Error procesando fila {row_index}: {str(e)}"
@@ -140,36 +207,92 @@ def process_row(
         logger.error(f"❌ ERROR: {file_code} - {error_msg}")
 
 
-def main_traffic():
-    """Función principal con logging completo"""
+def extract_traffic(
+    state: IncrementalState | None = None,
+    cookies: dict | None = None,
+    http_session=None,
+) -> pd.DataFrame:
+    """Scrapea traffic y guarda el snapshot crudo del extracto"""
+    logger = logging.getLogger(__name__)
+    logger.info("Iniciando comunicacion con traffic...")
+    data = main_scraper(state, cookies=cookies, session=http_session)
+    try:
+        # En incremental sólo vienen los shards que cambiaron: se marca parcial
+        save_snapshot(data, parcial=state is not None and not state.full_refresh)
+    except Exception as e:
+        # El snapshot es auxiliar: no debe frenar la carga
+        logger.warning(f"⚠️ No se pudo guardar el snapshot: {str(e)}")
+    return data
+
+
+def main_traffic(
+    incremental: bool = False,
+    full_refresh: bool = False,
+    replay: str | None = None,
+    data: pd.DataFrame | None = None,
+    dim_cache: DimensionCache | None = None,
+    cookies: dict | None = None,
+    http_session=None,
+):
+    """Función principal con logging completo.
+
+    Con `incremental=True` sólo se procesan los shards de fechas que cambiaron
+    desde la corrida anterior; `full_refresh=True` fuerza una extracción completa.
+    Con `replay` no se entra a traffic: se carga ese snapshot ("latest" para el
+    último guardado) y se corre la transformación y la carga sobre él.
+    Con `data` se carga un extracto ya obtenido por `extract_traffic`.
+    `dim_cache`, `cookies` y `http_session` permiten reutilizar estado ya
+    caliente (ver Pipeline.daemon).
+    """
     # Setup inicial
     logger = setup_logging()
     tracker = ProcessTracker()
+    state = None
+    cache = None
     try:
-        logger.info("Iniciando comunicacion con traffic...")
+        if replay:
+            data = load_snapshot(None if replay == "latest" else replay)
+        elif data is None:
+            if incremental:
+                state = IncrementalState.load(Paths.ESTADO_TRAFFIC)
+                state.begin(datetime.now(), force_full=full_refresh)
+            data = extract_traffic(state, cookies, http_session)
 
         logger.info("🔄 Iniciando preprocesamiento...")
-        data: pd.DataFrame = main_scraper()
         df_original_count = len(data)
 
         logger.info(
             f"📊 Archivo descargado exitosamente: {df_original_count} filas encontradas"
         )
+        if data.empty and state is not None:
+            # Ningún shard cambió desde la corrida anterior
+            logger.info("⚪ Sin cambios en traffic desde la última extracción")
+            state.save(datetime.now())
+            return
         df = ProcessData.preproccess_traffic(data)
 
         logger.info(
             f"✅ Preprocesamiento completado: {len(df)} filas válidas (eliminadas: {df_original_count - len(df)})"
         )
 
+        check_width()
         with Session(Paths.ENGINE) as session:
             # Cargar mapeos
-            proveedores_map = bulk_prov(df, session, logger)
-            pasajeros_map = bulk_pass(df, session, logger)
+            cache = DimensionCache.warm(session, dim_cache)
+            proveedores_map = bulk_prov(df, session, logger, cache)
+            pasajeros_map = bulk_pass(df, session, logger, cache)
             # Procesar filas
             logger.info("🚀 Iniciando procesamiento de reservas...")
             for index, row in df.iterrows():
                 process_row(
-                    session, row, proveedores_map, pasajeros_map, tracker, logger, index
+                    session,
+                    row,
+                    proveedores_map,
+                    pasajeros_map,
+                    tracker,
+                    logger,
+                    index,
+                    cache,
                 )
 
                 # Progress logging
@@ -178,16 +301,33 @@ def main_traffic():
                     logger.info(
                         f"📈 Progreso: {index + 1}/{len(df)} | Nuevos: {stats['nuevos']} | Actualizados: {stats['actualizados']} | Errores: {stats['errores']}"
                     )
+            run = refresh_prevision(session, tracker.reservas_tocadas, "traffic")
+            tracker.id_run = run.id_run
+            logger.info(
+                f"🧮 gabi_prevision refrescada: {len(tracker.reservas_tocadas)} reservas (run {run.id_run})"
+            )
             # Commit final
             logger.info("💾 Realizando commit final...")
             session.commit()
             logger.info("✅ Commit exitoso")
+            cache.save(session)
+            publish(tracker, "traffic", logger)
+
+        if state is not None:
+            # Los shards con filas que fallaron se vuelven a traer la próxima corrida
+            state.invalidate(e["fecha_pago_proveedor"] for e in tracker.error_records)
+            state.save(datetime.now())
+            logger.info(
+                f"🔖 Estado incremental guardado ({state.stats['invalidados']} shards con errores quedan pendientes)"
+            )
 
     except Exception as e:
         logger.error(f"❌ ERROR CRÍTICO: {str(e)}")
         if "session" in locals():
             session.rollback()
             logger.info("🔄 Rollback realizado")
+        if cache is not None:
+            cache.discard()
         raise
 
     finally:
@@ -204,8 +344,12 @@ def main_traffic():
         logger.info(f"✨ Nuevos registros: {summary['stats']['nuevos']}")
         logger.info(f"📝 Registros actualizados: {summary['stats']['actualizados']}")
         logger.info(f"⚪ Sin cambios: {summary['stats']['sin_cambios']}")
+        logger.info(f"🗄️ Archivados (no se modifican): {summary['stats']['archivados']}")
         logger.info(f"❌ Errores: {summary['stats']['errores']}")
         logger.info(f"📊 Tasa de éxito: {summary['tasa_exito']}%")
+        if cache is not None:
+            for tabla, tasa in cache.hit_rates().items():
+                logger.info(f"🗃️ Cache {tabla}: {tasa}% de aciertos")
 
         # Exportar a Excel
         logger.info("=" * 60)
@@ -0,0 +1,232 @@
+import argparse
+import contextlib
+import csv
+import logging
+import os
+import time
+import tracemalloc
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from sqlalchemy import bindparam
+from sqlmodel import text
+
+from Pipeline.resumen import COLUMNAS
+from Pipeline.utils import Paths
+
+VISTAS = ("gabi_prevision", "gabi_prevision_base", "gabi_prevision_historica")
+# Límite de filas de una hoja de Excel (encabezado incluido)
+MAX_FILAS_HOJA = 1_048_576
+
+# Tipos fijos para Parquet: todos los chunks tienen que compartir el schema
+SCHEMA = pa.schema(
+    [
+        ("id_reserva", pa.int32()),
+        ("file", pa.string()),
+        ("estado", pa.string()),
+        ("moneda", pa.string()),
+        ("total", pa.decimal128(15, 2)),
+        ("fecha_pago_proveedor", pa.date32()),
+        ("fecha_in", pa.date32()),
+        ("fecha_out", pa.date32()),
+        ("nombre_proveedor", pa.string()),
+        ("nombre_pasajero", pa.string()),
+        ("pais", pa.string()),
+        ("origen", pa.string()),
+        ("codigo_transferencia", pa.string()),
+        ("tipo_movimiento", pa.string()),
+        ("fecha_pago", pa.date32()),
+        ("descripcion", pa.string()),
+        ("moneda_pago", pa.string()),
+        ("monto", pa.decimal128(15, 2)),
+        ("tipo_de_cambio", pa.decimal128(15, 2)),
+        ("comision", pa.decimal128(15, 2)),
+        ("impuesto", pa.decimal128(15, 2)),
+        ("estado_pago", pa.string()),
+        ("tipo_de_saldo", pa.string()),
+        ("banco", pa.string()),
+    ]
+)
+
+
+class CsvWriter:
+    def __init__(self, path: str):
+        self.file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNAS)
+
+    def write(self, rows: list) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path: str):
+        self.writer = pq.ParquetWriter(path, SCHEMA, compression="zstd")
+
+    @staticmethod
+    def _column(values, tipo: pa.DataType) -> pa.Array:
+        """Columna con el tipo del schema sin depender del driver.
+
+        pymysql devuelve Decimal y date, que entran directo; otros drivers
+        devuelven int, float o str, y ahí se arma la columna con el tipo que
+        traigan y se castea. Los números pasan por float redondeado a la escala
+        del decimal: ni un float ni un int64 entran directo en decimal128(15, 2).
+        """
+        try:
+            return pa.array(values, type=tipo)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            pass
+        array = pa.array(values)
+        if pa.types.is_decimal(tipo) and (
+            pa.types.is_integer(array.type) or pa.types.is_floating(array.type)
+        ):
+            array = pc.round(array.cast(pa.float64()), tipo.scale)
+        return array.cast(tipo)
+
+    def write(self, rows: list) -> None:
+        columns = list(zip(*rows))
+        self.writer.write_table(pa.Table.from_arrays(
+            [self._column(col, f.type) for col, f in zip(columns, SCHEMA)],
+            schema=SCHEMA,
+        ))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class XlsxWriter:
+    """openpyxl en modo write-only: las filas se vuelcan al archivo a medida que llegan.
+
+    Cuando una hoja llega a MAX_FILAS_HOJA sigue en otra (gabi_prevision_2, ...),
+    cada una con su encabezado.
+    """
+
+    def __init__(self, path: str, max_filas: int = MAX_FILAS_HOJA):
+        self.path = path
+        self.max_filas = max_filas
+        self.workbook = Workbook(write_only=True)
+        self.hojas = 0
+        self._new_sheet()
+
+    def _new_sheet(self) -> None:
+        self.hojas += 1
+        nombre = "gabi_prevision" if self.hojas == 1 else f"gabi_prevision_{self.hojas}"
+        self.sheet = self.workbook.create_sheet(nombre)
+        self.sheet.append(COLUMNAS)
+        self.filas_hoja = 1
+
+    def write(self, rows: list) -> None:
+        for row in rows:
+            if self.filas_hoja >= self.max_filas:
+                self._new_sheet()
+            self.sheet.append(row)
+            self.filas_hoja += 1
+
+    def close(self) -> None:
+        self.workbook.save(self.path)
+
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter, "xlsx": XlsxWriter}
+
+
+def build_query(
+    vista: str,
+    desde: date | None = None,
+    hasta: date | None = None,
+    monedas: list[str] | None = None,
+):
+    if vista not in VISTAS:
+        raise ValueError(f"Vista no permitida: {vista}")
+    where, params = [], {}
+    if desde is not None:
+        where.append("fecha_pago_proveedor >= :desde")
+        params["desde"] = desde
+    if hasta is not None:
+        where.append("fecha_pago_proveedor <= :hasta")
+        params["hasta"] = hasta
+    if monedas:
+        where.append("moneda IN :monedas")
+        params["monedas"] = monedas
+
+    sql = f"SELECT {', '.join(COLUMNAS)} FROM {vista}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    stmt = text(sql)
+    if monedas:
+        stmt = stmt.bindparams(bindparam("monedas", expanding=True))
+    return stmt, params
+
+
+def export_prevision(
+    path: str,
+    formato: str = "csv",
+    desde: date | None = None,
+    hasta: date | None = None,
+    monedas: list[str] | None = None,
+    vista: str = "gabi_prevision",
+    chunk: int = 10_000,
+    engine=Paths.ENGINE,
+) -> int:
+    """Exporta la vista en chunks de `chunk` filas con un cursor del lado del servidor.
+
+    Nunca hay más de un chunk en memoria, así que el pico no depende del total.
+    Se escribe a `path`.parcial y se renombra recién al terminar: si algo falla
+    no queda un archivo a medias con el nombre final.
+    """
+    if formato not in WRITERS:
+        raise ValueError(
+            f"Formato no soportado: {formato} (soportados: {', '.join(WRITERS)})"
+        )
+    stmt, params = build_query(vista, desde, hasta, monedas)
+    parcial = f"{path}.parcial"
+    writer = WRITERS[formato](parcial)
+    filas = 0
+    try:
+        with engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, max_row_buffer=chunk
+            ).execute(stmt, params)
+            for rows in result.partitions(chunk):
+                writer.write([tuple(r) for r in rows])
+                filas += len(rows)
+                logging.info(f"   Exportadas {filas} filas")
+        writer.close()
+    except BaseException:
+        with contextlib.suppress(Exception):
+            writer.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(parcial)
+        raise
+    os.replace(parcial, path)
+    return filas
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Exporta gabi_prevision sin cargarla entera")
+    parser.add_argument("path")
+    parser.add_argument("--formato", choices=list(WRITERS), default=None)
+    parser.add_argument("--desde", type=date.fromisoformat)
+    parser.add_argument("--hasta", type=date.fromisoformat)
+    parser.add_argument("--moneda", action="append", help="P, D, L o B (repetible)")
+    parser.add_argument("--vista", choices=VISTAS, default="gabi_prevision")
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--medir", action="store_true", help="reporta pico de memoria")
+    args = parser.parse_args()
+
+    formato = args.formato or args.path.rsplit(".", 1)[-1].lower()
+    if args.medir:
+        tracemalloc.start()
+    start = time.perf_counter()
+    filas = export_prevision(
+        args.path, formato, args.desde, args.hasta, args.moneda, args.vista, args.chunk
+    )
+    logging.info(f"✅ {filas} filas exportadas a {args.path} en {time.perf_counter() - start:.1f} s")
+    if args.medir:
+        logging.info(f"📊 Pico de memoria: {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MB")
@@ -0,0 +1,226 @@
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam
+from sqlmodel import text
+
+from Pipeline.utils import Paths
+
+# Saldos que ya cancelan (total o parcialmente) lo que se le debe al proveedor
+ESTADOS_PAGADOS = ("PAGADO", "UTILIZADO")
+# tipo_de_cambio expresa pesos por unidad de la otra moneda
+PESOS = "P"
+DIMENSIONES = ["bucket", "moneda", "nombre_proveedor", "origen"]
+
+QUERY = """
+SELECT id_reserva, moneda, total, fecha_pago_proveedor, nombre_proveedor, origen,
+       tipo_movimiento, moneda_pago, monto, tipo_de_cambio, estado_pago, id_run
+FROM gabi_prevision_mat
+{where}
+"""
+POR_RUNS = text(QUERY.format(where="WHERE id_run IN :runs")).bindparams(
+    bindparam("runs", expanding=True)
+)
+RUNS = text("SELECT id_run, proceso FROM etl_runs")
+# Única vía por la que una reserva sale del materializado sin fila nueva
+RETENCION = "retencion"
+VIGENTES = text("SELECT DISTINCT id_reserva FROM gabi_prevision_mat")
+
+
+def monto_en_moneda(rows: pd.DataFrame) -> pd.Series:
+    """Monto de cada saldo en la moneda de su reserva, con signo por tipo_movimiento.
+
+    Los egresos (E) cancelan deuda con el proveedor y los ingresos (I), p. ej.
+    devoluciones, la vuelven a sumar. Los pagos en otra moneda se convierten a
+    través de pesos con el tipo_de_cambio del saldo; los que no se pueden
+    convertir (sin tipo de cambio o entre dos monedas extranjeras) quedan en NaN.
+    """
+    monto = pd.to_numeric(rows["monto"], errors="coerce").astype("float64")
+    tc = pd.to_numeric(rows["tipo_de_cambio"], errors="coerce").astype("float64")
+    tc = tc.where(tc > 0)
+    moneda, pago = rows["moneda"].astype(object), rows["moneda_pago"].astype(object)
+
+    convertido = pd.Series(np.nan, index=rows.index)
+    misma = (pago == moneda) | pago.isna()
+    convertido[misma] = monto[misma]
+    a_pesos = (moneda == PESOS) & (pago != PESOS) & ~misma
+    convertido[a_pesos] = monto[a_pesos] * tc[a_pesos]
+    desde_pesos = (moneda != PESOS) & (pago == PESOS) & ~misma
+    convertido[desde_pesos] = monto[desde_pesos] / tc[desde_pesos]
+
+    signo = np.where(rows["tipo_movimiento"].astype(object) == "I", -1.0, 1.0)
+    return convertido * signo
+
+
+class ForecastEngine:
+    """Previsión de pagos a proveedores sobre reservas y saldos.
+
+    Carga gabi_prevision_mat una sola vez en un DataFrame columnar (una fila
+    por reserva) y calcula el saldo pendiente por bucket de fecha, moneda,
+    proveedor y origen con group-bys vectorizados. El resultado queda
+    cacheado junto con los id_run ya vistos; `refresh()` sólo relee las
+    reservas de corridas nuevas (en el orden en que hayan commiteado), descarta
+    las que ya no están en el materializado si alguna fue de retención y
+    recalcula los buckets que tocaron.
+    """
+
+    def __init__(self, engine=Paths.ENGINE, freq: str = "W"):
+        self.engine = engine
+        self.freq = freq
+        self.reservas: pd.DataFrame | None = None
+        self.result: pd.DataFrame | None = None
+        self.runs: set[int] = set()
+
+    # --- Carga ---
+    @staticmethod
+    def _read(conn, runs: set | None = None) -> pd.DataFrame:
+        if runs is None:
+            return pd.read_sql(text(QUERY.format(where="")), conn)
+        return pd.read_sql(POR_RUNS, conn, params={"runs": sorted(runs)})
+
+    @staticmethod
+    def per_reserva(rows: pd.DataFrame, freq: str) -> pd.DataFrame:
+        """Colapsa las filas de la vista (reserva x saldo) a una fila por reserva"""
+        rows = rows.copy()
+        monto = monto_en_moneda(rows)
+        pagados = rows["estado_pago"].isin(ESTADOS_PAGADOS)
+        sin_convertir = int((pagados & rows["monto"].notna() & monto.isna()).sum())
+        if sin_convertir:
+            logging.warning(
+                f"⚠️ {sin_convertir} saldos pagados sin tipo de cambio para la moneda de su reserva: no se descuentan"
+            )
+        rows["pagado"] = monto.fillna(0).where(pagados, 0.0)
+        df = rows.groupby("id_reserva", sort=False).agg(
+            moneda=("moneda", "first"),
+            total=("total", "first"),
+            fecha_pago_proveedor=("fecha_pago_proveedor", "first"),
+            nombre_proveedor=("nombre_proveedor", "first"),
+            origen=("origen", "first"),
+            pagado=("pagado", "sum"),
+            id_run=("id_run", "max"),
+        )
+        df["total"] = df["total"].astype("float64")
+        df["pendiente"] = np.maximum(df["total"] - df["pagado"], 0.0)
+        fechas = pd.to_datetime(df["fecha_pago_proveedor"])
+        df["bucket"] = fechas.dt.to_period(freq).dt.start_time
+        for col in ("moneda", "nombre_proveedor", "origen"):
+            df[col] = df[col].astype("category")
+        return df
+
+    @classmethod
+    def from_frame(cls, rows: pd.DataFrame, freq: str = "W") -> "ForecastEngine":
+        """Arma el motor desde filas ya leídas (tests y benchmarks)"""
+        engine = cls(engine=None, freq=freq)
+        engine.reservas = cls.per_reserva(rows, freq)
+        engine.runs = set(rows["id_run"].dropna().astype(int))
+        engine.result = engine._aggregate(engine.reservas)
+        return engine
+
+    def load(self) -> pd.DataFrame:
+        # Runs y filas en la misma conexión: un run que commitea en el medio
+        # no puede quedar marcado como visto sin sus filas
+        with self.engine.connect() as conn:
+            self.runs = {id_run for id_run, _ in conn.execute(RUNS)}
+            rows = self._read(conn)
+        self.reservas = self.per_reserva(rows, self.freq)
+        self.result = self._aggregate(self.reservas)
+        logging.info(
+            f"📈 Previsión cargada: {len(self.reservas)} reservas, {len(self.result)} grupos ({len(self.runs)} runs)"
+        )
+        return self.result
+
+    # --- Agregación ---
+    @staticmethod
+    def _aggregate(reservas: pd.DataFrame) -> pd.DataFrame:
+        return (
+            reservas.groupby(DIMENSIONES, observed=True, sort=False)
+            .agg(
+                total=("total", "sum"),
+                pagado=("pagado", "sum"),
+                pendiente=("pendiente", "sum"),
+                reservas=("total", "size"),
+            )
+            .reset_index()
+        )
+
+    def apply(self, changed: pd.DataFrame, removidas=()) -> int:
+        """Reemplaza las reservas de `changed`, quita las `removidas` y
+        recalcula sólo los buckets afectados.
+
+        Devuelve la cantidad de buckets recalculados.
+        """
+        changed = self.per_reserva(changed, self.freq)
+        viejas = self.reservas.index.intersection(changed.index.union(pd.Index(removidas)))
+        buckets = pd.Index(self.reservas.loc[viejas, "bucket"]).union(
+            pd.Index(changed["bucket"])
+        ).dropna().unique()
+
+        resto = self.reservas.drop(index=viejas)
+        self.reservas = pd.concat([resto, changed])
+        for col in ("moneda", "nombre_proveedor", "origen"):
+            self.reservas[col] = self.reservas[col].astype("category")
+
+        afectadas = self.reservas[self.reservas["bucket"].isin(buckets)]
+        recalculado = self._aggregate(afectadas)
+        self.result = pd.concat(
+            [self.result[~self.result["bucket"].isin(buckets)], recalculado],
+            ignore_index=True,
+        )
+        self.runs.update(changed["id_run"].dropna().astype(int))
+        return len(buckets)
+
+    def refresh(self) -> pd.DataFrame:
+        """Trae lo que cambió en los runs que no vio; si no hay ninguno usa el cache.
+
+        Compara contra el conjunto de runs vistos y no contra el máximo: un
+        backfill en paralelo puede commitear un id_run menor después de uno mayor.
+        """
+        if self.reservas is None:
+            return self.load()
+
+        with self.engine.connect() as conn:
+            nuevos = {
+                id_run: proceso for id_run, proceso in conn.execute(RUNS) if id_run not in self.runs
+            }
+            if not nuevos:
+                return self.result
+            changed = self._read(conn, set(nuevos))
+            # Reservas que salieron del materializado sin fila nueva: sólo la
+            # retención las borra, así que el barrido completo se hace sólo
+            # cuando entre los runs nuevos hay alguno de retención
+            if RETENCION in nuevos.values():
+                vigentes = pd.Index(conn.execute(VIGENTES).scalars().all())
+                removidas = self.reservas.index.difference(vigentes)
+            else:
+                removidas = pd.Index([])
+
+        buckets = self.apply(changed, removidas) if len(changed) or len(removidas) else 0
+        self.runs |= set(nuevos)
+        logging.info(
+            f"📈 Previsión actualizada ({len(nuevos)} runs nuevos): {changed['id_reserva'].nunique()} reservas, "
+            f"{len(removidas)} removidas, {buckets} buckets recalculados"
+        )
+        return self.result
+
+    # --- Consultas ---
+    def forecast(
+        self,
+        desde: date | None = None,
+        hasta: date | None = None,
+        por: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """Pendiente agregado por las dimensiones pedidas (por defecto todas)"""
+        result = self.refresh() if self.engine is not None else self.result
+        if desde is not None:
+            result = result[result["bucket"] >= pd.Timestamp(desde)]
+        if hasta is not None:
+            result = result[result["bucket"] <= pd.Timestamp(hasta)]
+        por = por or DIMENSIONES
+        return (
+            result.groupby(por, observed=True)[["total", "pagado", "pendiente", "reservas"]]
+            .sum()
+            .reset_index()
+            .sort_values(por)
+        )
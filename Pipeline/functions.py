@@ -1,10 +1,10 @@
 import pandas as pd
-from sqlmodel import select, Session
+from sqlmodel import select, Session, text
 import logging
 from datetime import datetime
 import hashlib
+import unicodedata
 from Pipeline.utils import Paths
-from Pipeline.models import Iata
 
 
 class ProcessData:
@@ -22,7 +22,8 @@ class ProcessData:
             "codigo_iata",
         ]
         row_str = "|".join(str(row[c]) for c in claves)
-        return hashlib.sha256(row_str.encode()).hexdigest()
+        # Digest crudo (no hex): la mitad de bytes en la columna, el índice y memoria
+        return hashlib.sha256(row_str.encode()).digest()[: Paths.HASH_BYTES]
 
     @staticmethod
     def clean_str(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
@@ -36,7 +37,9 @@ class ProcessData:
         return None if pd.isna(value) else value
 
     @staticmethod
-    def preproccess_traffic(df: pd.DataFrame) -> pd.DataFrame:
+    def preproccess_traffic(
+        df: pd.DataFrame, errores_path: str | None = Paths.ERRORES
+    ) -> pd.DataFrame:
         # --- Limpiar strings primero ---
         df = ProcessData.clean_str(
             df, ["estado", "moneda", "proveedor", "pasajero", "codigo_iata"]
@@ -52,7 +55,7 @@ class ProcessData:
         # --- Convertir fechas ---
         date_cols = ["fecha_pago_proveedor", "fecha_in", "fecha_out", "fecha_sal"]
         for col in date_cols:
-            df.loc[:, col] = pd.to_datetime(df[col], errors="coerce").dt.date
+            df[col] = pd.to_datetime(df[col], errors="coerce").dt.date
 
         # --- Crear hash determinista ---
         df["hash"] = df.apply(ProcessData.hash_row, axis=1)
@@ -66,8 +69,12 @@ class ProcessData:
         df.dropna(subset=["file"], inplace=True)
 
         # --- Guardar eliminadas en un Excel ---
-        removed_rows = pd.concat([duplicated_rows, missing_file_rows]).drop_duplicates()
-        removed_rows.to_excel(Paths.ERRORES, index=False)
+        if errores_path is not None:
+            removed_rows = pd.concat(
+                [duplicated_rows, missing_file_rows]
+            ).drop_duplicates()
+            removed_rows["hash"] = removed_rows["hash"].map(bytes.hex)
+            removed_rows.to_excel(errores_path, index=False)
 
         return df
 
@@ -139,6 +146,65 @@ def verify_existence(session, model, field_name, value):
         return None
 
 
+def _collation_key(value) -> str:
+    """Aproxima la collation *_ai_ci de MySQL: sin mayúsculas ni acentos"""
+    value = unicodedata.normalize("NFKD", str(value).casefold())
+    return "".join(c for c in value if not unicodedata.combining(c))
+
+
+def bulk_verify_existence(engine, model, field_name, values, chunk=1000) -> dict:
+    """Versión masiva de verify_existence, segura entre procesos.
+
+    Toma un lock con nombre de MySQL por tabla, busca los valores que ya existen,
+    inserta los faltantes y hace commit antes de soltar el lock: así dos workers
+    nunca crean el mismo proveedor/pasajero. Igual que verify_existence, un
+    valor que la collation considera igual a uno existente (mayúsculas,
+    acentos) reutiliza ese id. Devuelve {valor: id}.
+    """
+    values = [v for v in dict.fromkeys(values) if v is not None and not pd.isna(v)]
+    field = getattr(model, field_name)
+    pk_name = model.__table__.primary_key.columns.keys()[0]
+    pk = getattr(model, pk_name)
+    lock_name = f"prevision_{model.__tablename__}"
+
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT GET_LOCK(:n, 60)"), {"n": lock_name}).scalar() != 1:
+            raise TimeoutError(f"No se pudo tomar el lock {lock_name}")
+        conn.commit()  # el snapshot de lectura arranca recién con el lock tomado
+        try:
+            with Session(bind=conn) as session:
+                # IN compara con la collation de la tabla (sin mayúsculas ni
+                # acentos): los nombres devueltos pueden no ser idénticos a los pedidos
+                existentes = {}
+                for i in range(0, len(values), chunk):
+                    rows = session.exec(
+                        select(field, pk).where(field.in_(values[i : i + chunk]))
+                    ).all()
+                    for name, id_ in rows:
+                        existentes.setdefault(_collation_key(name), id_)
+
+                found = {}
+                for v in values:
+                    id_ = existentes.get(_collation_key(v))
+                    if id_ is None:
+                        # La clave normalizada es una aproximación: antes de insertar
+                        # se confirma contra la BDD, que aplica la collation exacta.
+                        # El flush hace visible el alta para los valores siguientes.
+                        id_ = session.exec(select(pk).where(field == v)).first()
+                        if id_ is None:
+                            obj = model(**{field_name: v})
+                            session.add(obj)
+                            session.flush()
+                            id_ = getattr(obj, pk_name)
+                        existentes[_collation_key(v)] = id_
+                    found[v] = id_
+                session.commit()
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:n)"), {"n": lock_name})
+            conn.commit()
+    return found
+
+
 #############################################################################################
 # RELACIONADO CON LOGS
 def setup_logging():
@@ -166,12 +232,17 @@ class ProcessTracker:
             "nuevos": 0,
             "actualizados": 0,
             "sin_cambios": 0,
+            "archivados": 0,
             "errores": 0,
             "total_procesadas": 0,
         }
         self.updated_records = []
         self.error_records = []
         self.new_records = []
+        self.archived_records = []
+        self.reservas_tocadas = set()
+        self.changes = []
+        self.id_run = None
         self.start_time = datetime.now()
 
     def add_new(self, file_code, row_data):
@@ -206,10 +277,46 @@ class ProcessTracker:
         )
         print(self.updated_records[-1])
 
+    def add_change(self, op, tabla, id_reserva, valores, campos=None, id_saldo=None):
+        """Registra una fila escrita para el changefeed (ver Pipeline.changefeed).
+
+        Los eventos de saldos se identifican por `id_saldo`; `id_reserva`
+        queda como referencia a su reserva.
+        """
+        clave = {"id_reserva": id_reserva}
+        if id_saldo is not None:
+            clave = {"id_saldo": id_saldo, **clave}
+        self.changes.append(
+            {
+                "op": op,
+                "tabla": tabla,
+                **clave,
+                "campos": list(campos if campos is not None else valores),
+                "valores": valores,
+            }
+        )
+
+    def touch(self, id_reserva):
+        """Marca una reserva para refrescar en gabi_prevision_mat"""
+        if id_reserva is not None:
+            self.reservas_tocadas.add(id_reserva)
+
     def add_no_change(self):
         """Registra un registro sin cambios"""
         self.stats["sin_cambios"] += 1
 
+    def add_archived(self, file_code, row_data, detalle):
+        """Registra una fila de una reserva ya archivada (no se escribe)"""
+        self.stats["archivados"] += 1
+        self.archived_records.append(
+            {
+                "file": file_code,
+                "accion": "ARCHIVADO",
+                "timestamp": datetime.now(),
+                "detalle": detalle,
+            }
+        )
+
     def add_error(self, file_code, row_data, error_msg):
         """Registra un error"""
         self.stats["errores"] += 1
@@ -227,6 +334,9 @@ class ProcessTracker:
                 "monto": (
                     row_data.get("monto_a_pagar", 0) if row_data is not None else 0
                 ),
+                "fecha_pago_proveedor": (
+                    row_data.get("fecha_pago_proveedor") if row_data is not None else None
+                ),
                 "error": error_msg,
                 "detalle": f"Error durante procesamiento: {error_msg}",
             }
@@ -256,82 +366,7 @@ class ProcessTracker:
 
 
 def init_iata():
+    """Compatibilidad: la carga de IATAs vive en Pipeline.referencias"""
+    from Pipeline.referencias import init_iatas
 
-    df = pd.read_excel(Paths.IATA_PATH)
-
-    def replacer_interrog(country: str):
-        return country.replace("?", "N")
-
-    paises = [
-        "Hong Kong",  # AEROPUERTO DE HONG KONG
-        "Emiratos Árabes Unidos",  # AL AIN
-        "Líbano",  # BEIRUT
-        "Líbano",  # BROUMANA
-        "Croacia",  # CAVTAT
-        "Croacia",  # CRES
-        None,  # CRUCEROS
-        "Curazao",  # CURACAO
-        "Hong Kong",  # HONG KONG
-        "Hong Kong",  # HONG KONG
-        "Hong Kong",  # HONG KONG CHEUNG CHAU
-        "Hong Kong",  # HONG KONG SUR
-        "Hong Kong",  # HONG KONG TSING YI
-        "Croacia",  # HVAR
-        "Croacia",  # ISTRIA
-        "Líbano",  # JOUNIEH
-        "Líbano",  # KFARDEBIANE
-        "Croacia",  # KOLOCEP
-        "Croacia",  # KORENICA
-        "Hong Kong",  # KOWLOON
-        "Croacia",  # KVARNER BAY
-        "Islas Caimán",  # LITTLE CAYMAN
-        "Macao",  # MACAU
-        "Croacia",  # OMIS
-        "Croacia",  # OPATIJA
-        "Croacia",  # OREBIC
-        "Croacia",  # PLITVICE PARQUE NACIONAL
-        "Croacia",  # POREC
-        "Croacia",  # PULA
-        "Emiratos Árabes Unidos",  # RAS AL KHAYMAH
-        "Croacia",  # RIJEKA
-        "Croacia",  # ROVINJ
-        "República Dominicana",  # SAMANA
-        "Sint Maarten",  # SAN MAARTEN-OYSTER PO
-        "Hong Kong",  # SHATIN
-        "Croacia",  # SIBENIK
-        "Croacia",  # SOLIN
-        "Croacia",  # SPLIT
-        "Croacia",  # SPLIT-MIDDLE DALMATIA
-        "Croacia",  # STARI GRAD (HVAR)
-        "Hong Kong",  # TINSHUIWAI
-        "Líbano",  # TRIPOLI (LB)
-        "Croacia",  # TROGIR
-        "Hong Kong",  # TSUEN WAN
-        "Hong Kong",  # TUEN MUN
-        "Croacia",  # VODICE
-        "Croacia",  # VRSAR
-        "Estados Unidos",  # WEST YELLOWSTONE
-        "Croacia",  # ZADAR-NORTH DALMATIA
-        "REINO UNIDO",  # nan
-    ]
-
-    with Session(Paths.ENGINE) as session:
-        empty = df[df.Idpaises.isnull()]
-        paises_mayus = [p.upper() if p is not None else None for p in paises]
-        empty.loc[:, "Idpaises"] = paises_mayus
-
-        data = pd.merge(df, empty, how="outer")
-        data.loc[data["Codigociudad"] == "EXT", "Nombreciudad"] = "Exeter"
-        data.dropna(inplace=True)
-
-        data["Idpaises"] = data["Idpaises"].astype(str).apply(replacer_interrog)
-
-        for _, row in data.iterrows():
-            iata = row["Codigociudad"]
-            country = row["Idpaises"]
-
-            # evitar insertar 'nan' como texto
-            if pd.notna(iata) and pd.notna(country):
-                session.add(Iata(codigo_iata=iata, pais=country))
-
-        session.commit()
+    return init_iatas(Paths.IATA_PATH)
@@ -0,0 +1,148 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+
+
+FORMATO_FECHA = "%Y/%m/%d"
+
+
+def split_range(
+    desde: datetime.date, hasta: datetime.date, dias: int
+) -> list[tuple[datetime.date, datetime.date]]:
+    """Parte [desde, hasta] en shards consecutivos de `dias` días (ambos extremos inclusive)"""
+    shards = []
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + datetime.timedelta(days=dias - 1), hasta)
+        shards.append((inicio, fin))
+        inicio = fin + datetime.timedelta(days=1)
+    return shards
+
+
+def fingerprint(content: bytes) -> str:
+    """Huella de una página tal como la devuelve traffic"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class IncrementalState:
+    """Huellas por página de cada shard en la última extracción de traffic.
+
+    Se guarda en un JSON. Los cambios quedan pendientes hasta llamar a `save()`,
+    que se debe hacer recién después del commit en la BDD: si la corrida falla,
+    la próxima vuelve a procesar los mismos shards. Los shards con filas que no
+    se pudieron cargar se descartan con `invalidate()` antes de guardar.
+    """
+
+    def __init__(self, path: str, shard_dias: int = 7, full_refresh_horas: int = 24):
+        self.path = path
+        self.shard_dias = shard_dias
+        self.full_refresh_horas = full_refresh_horas
+        self.ultima_completa: datetime.datetime | None = None
+        self.shards: dict = {}
+        self.pendientes: dict = {}
+        self.full_refresh = True
+        self.stats = {"procesados": 0, "sin_cambios": 0, "invalidados": 0}
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "IncrementalState":
+        state = cls(path, **kwargs)
+        if not os.path.exists(path):
+            return state
+
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        if raw.get("shard_dias") != state.shard_dias:
+            # Cambió el tamaño de shard: las huellas guardadas no son comparables
+            logging.info("Tamaño de shard distinto al guardado, se descarta el estado")
+            return state
+
+        state.ultima_completa = datetime.datetime.fromisoformat(raw["ultima_completa"])
+        state.shards = raw.get("shards", {})
+        return state
+
+    def begin(self, now: datetime.datetime, force_full: bool = False) -> None:
+        """Decide si la corrida es completa o incremental"""
+        self.full_refresh = (
+            force_full
+            or self.ultima_completa is None
+            or now - self.ultima_completa
+            >= datetime.timedelta(hours=self.full_refresh_horas)
+        )
+        self.pendientes = {}
+        self.stats = {"procesados": 0, "sin_cambios": 0, "invalidados": 0}
+
+    def split(
+        self, desde: datetime.date, hasta: datetime.date
+    ) -> list[tuple[str, datetime.date, datetime.date]]:
+        """(clave, desde, hasta) de cada shard de la ventana.
+
+        Los shards se alinean a un calendario fijo y la clave es la del shard
+        completo: el primero y el último se piden recortados a la ventana, pero
+        conservan la misma clave mientras la ventana avanza dentro de ellos.
+        """
+        inicio = desde - datetime.timedelta(days=desde.toordinal() % self.shard_dias)
+        fin = hasta + datetime.timedelta(
+            days=-(hasta.toordinal() + 1) % self.shard_dias
+        )
+        return [
+            (self.key(d, h), max(d, desde), min(h, hasta))
+            for d, h in split_range(inicio, fin, self.shard_dias)
+        ]
+
+    @staticmethod
+    def key(desde: datetime.date, hasta: datetime.date) -> str:
+        return f"{desde.strftime(FORMATO_FECHA)}-{hasta.strftime(FORMATO_FECHA)}"
+
+    def unchanged(self, key: str, paginas: list[str]) -> bool:
+        if self.full_refresh:
+            return False
+        previo = self.shards.get(key)
+        return previo is not None and previo["paginas"] == paginas
+
+    def record(self, key: str, paginas: list[str], changed: bool) -> None:
+        self.pendientes[key] = {"paginas": paginas}
+        self.stats["procesados" if changed else "sin_cambios"] += 1
+
+    def invalidate(self, fechas) -> None:
+        """Olvida los shards que contienen alguna de `fechas` (filas con error).
+
+        Sin huella previa, la próxima corrida los vuelve a procesar completos.
+        Una fila sin fecha no se puede ubicar: se descartan todos los shards.
+        """
+        rangos = {}
+        for key in self.pendientes:
+            d, h = key.split("-")
+            rangos[key] = (
+                datetime.datetime.strptime(d, FORMATO_FECHA).date(),
+                datetime.datetime.strptime(h, FORMATO_FECHA).date(),
+            )
+        for fecha in fechas:
+            if fecha is None or fecha != fecha:  # None / NaT
+                self.stats["invalidados"] += len(self.pendientes)
+                self.pendientes = {}
+                return
+            for key, (d, h) in rangos.items():
+                if d <= fecha <= h and key in self.pendientes:
+                    del self.pendientes[key]
+                    self.stats["invalidados"] += 1
+
+    def save(self, now: datetime.datetime) -> None:
+        """Persiste el estado de la corrida (llamar después del commit)"""
+        if self.full_refresh:
+            self.ultima_completa = now
+        self.shards = self.pendientes
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "shard_dias": self.shard_dias,
+                    "ultima_completa": self.ultima_completa.isoformat(),
+                    "shards": self.shards,
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
@@ -0,0 +1,155 @@
+import argparse
+import logging
+import time
+
+from sqlmodel import text
+
+from Pipeline.functions import setup_logging
+from Pipeline.utils import Paths
+
+# tabla: lleva índice único sobre hash
+TABLAS = {"reservas": True, "reservas_hist": True}
+
+
+def column_type(conn, tabla: str) -> str | None:
+    return conn.execute(
+        text(
+            "SELECT COLUMN_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND COLUMN_NAME = 'hash'"
+        ),
+        {"t": tabla},
+    ).scalar()
+
+
+def index_sizes(conn, tabla: str) -> dict:
+    """MB por índice (innodb_index_stats) y total de índices de la tabla"""
+    conn.execute(text(f"ANALYZE TABLE {tabla}"))
+    rows = conn.execute(
+        text(
+            "SELECT index_name, stat_value * @@innodb_page_size / 1048576 "
+            "FROM mysql.innodb_index_stats "
+            "WHERE database_name = DATABASE() AND table_name = :t AND stat_name = 'size'"
+        ),
+        {"t": tabla},
+    ).all()
+    sizes = {name: round(float(mb), 2) for name, mb in rows}
+    sizes["total_indices"] = round(
+        float(
+            conn.execute(
+                text(
+                    "SELECT INDEX_LENGTH / 1048576 FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"
+                ),
+                {"t": tabla},
+            ).scalar()
+        ),
+        2,
+    )
+    return sizes
+
+
+def check_width(engine=Paths.ENGINE) -> None:
+    """Falla si reservas.hash no tiene el ancho de Paths.HASH_BYTES.
+
+    Un digest de 16 bytes en una columna BINARY(32) se rellena con ceros y
+    ninguna búsqueda por hash vuelve a coincidir: se reinsertaría todo.
+    """
+    with engine.connect() as conn:
+        tipo = column_type(conn, "reservas")
+    if tipo != f"binary({Paths.HASH_BYTES})":
+        raise ValueError(
+            f"reservas.hash es {tipo} y HASH_BYTES es {Paths.HASH_BYTES}: "
+            f"correr python -m Pipeline.migracion_hash --bytes {Paths.HASH_BYTES}"
+        )
+
+
+def _digest(tipo: str) -> str:
+    # Columna de origen como bytes crudos: hex (CHAR(64)) o ya binaria
+    return "UNHEX(hash)" if tipo.startswith("char") else "hash"
+
+
+def collisions(conn, tabla: str, n: int) -> list:
+    """Digests que chocan al truncar a `n` bytes (tienen que ser cero para migrar)"""
+    return conn.execute(
+        text(
+            f"SELECT HEX(LEFT({_digest(column_type(conn, tabla))}, :n)) AS h, COUNT(*) AS c "
+            f"FROM {tabla} GROUP BY h HAVING c > 1"
+        ),
+        {"n": n},
+    ).all()
+
+
+def migrate_table(conn, tabla: str, unique: bool, n: int, lote: int) -> None:
+    origen = _digest(column_type(conn, tabla))
+    conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN hash_bin BINARY({n}) NULL AFTER hash"))
+    conn.commit()
+
+    # En lotes por id: un UPDATE de toda la tabla bloquea demasiado
+    maximo = conn.execute(text(f"SELECT COALESCE(MAX(id_reserva), 0) FROM {tabla}")).scalar()
+    for desde in range(0, maximo + 1, lote):
+        conn.execute(
+            text(
+                f"UPDATE {tabla} SET hash_bin = LEFT({origen}, :n) "
+                "WHERE id_reserva >= :desde AND id_reserva < :hasta"
+            ),
+            {"n": n, "desde": desde, "hasta": desde + lote},
+        )
+        conn.commit()
+
+    conn.execute(
+        text(
+            f"ALTER TABLE {tabla} DROP COLUMN hash, "
+            f"CHANGE COLUMN hash_bin hash BINARY({n}) NOT NULL"
+        )
+    )
+    if unique:
+        conn.execute(text(f"ALTER TABLE {tabla} ADD UNIQUE INDEX hash (hash)"))
+    conn.commit()
+
+
+def migrate(n: int = Paths.HASH_BYTES, lote: int = 50_000, engine=Paths.ENGINE) -> dict:
+    """Convierte reservas.hash (y reservas_hist.hash) de hex, o de BINARY(32)
+    si se trunca, a BINARY(n).
+
+    db.sql crea BINARY(32): para digests de 16 bytes se corre esto después.
+    Es idempotente: las tablas que ya son BINARY(n) se saltean. Con n < 32
+    aborta antes de tocar nada si algún par de digests choca al truncarse.
+    Devuelve el tamaño de los índices antes y después.
+    """
+    logger = logging.getLogger(__name__)
+    resultado = {}
+    with engine.connect() as conn:
+        tablas = {t: u for t, u in TABLAS.items() if column_type(conn, t) is not None}
+        if n < 32:
+            for tabla in tablas:
+                if column_type(conn, tabla) != f"binary({n})" and collisions(conn, tabla, n):
+                    raise ValueError(f"{tabla}: hay colisiones al truncar a {n} bytes")
+
+        for tabla, unique in tablas.items():
+            tipo = column_type(conn, tabla)
+            if tipo == f"binary({n})":
+                logger.info(f"⏭️ {tabla}.hash ya es {tipo}")
+                continue
+            if not (tipo.startswith("char") or (tipo == "binary(32)" and n < 32)):
+                raise ValueError(f"{tabla}.hash es {tipo}; no se puede migrar a BINARY({n})")
+
+            antes = index_sizes(conn, tabla)
+            start = time.perf_counter()
+            migrate_table(conn, tabla, unique, n, lote)
+            despues = index_sizes(conn, tabla)
+            resultado[tabla] = {"antes": antes, "despues": despues}
+            logger.info(
+                f"✅ {tabla}.hash → BINARY({n}) en {time.perf_counter() - start:.1f} s | "
+                f"índices: {antes['total_indices']} MB → {despues['total_indices']} MB "
+                f"(hash: {antes.get('hash')} MB → {despues.get('hash')} MB)"
+            )
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra reservas.hash a binario")
+    parser.add_argument("--bytes", type=int, choices=[16, 32], default=Paths.HASH_BYTES)
+    parser.add_argument("--lote", type=int, default=50_000)
+    args = parser.parse_args()
+    setup_logging()
+    migrate(args.bytes, args.lote)
@@ -1,5 +1,7 @@
+from sqlalchemy import BINARY, Column
 from sqlmodel import SQLModel, Field
-from datetime import date
+from datetime import date, datetime
+from Pipeline.utils import Paths
 
 
 class Proveedor(SQLModel, table=True):
@@ -37,7 +39,9 @@ class Reserva(SQLModel, table=True):
     fecha_in: date | None
     fecha_out: date | None
     fecha_sal: date | None
-    hash: str | None = Field(max_length=64)
+    hash: bytes = Field(
+        sa_column=Column(BINARY(Paths.HASH_BYTES), unique=True, nullable=False)
+    )
     id_proveedor: int = Field(foreign_key="proveedores.id_proveedor")
     id_pasajero: int = Field(foreign_key="pasajeros.id_pasajero")
     codigo_iata: str = Field(max_length=3, foreign_key="iatas.codigo_iata")
@@ -59,3 +63,46 @@ class Saldo(SQLModel, table=True):
     tipo_de_saldo: str | None
     id_reserva: int = Field(foreign_key="reservas.id_reserva")
     id_cuenta: int = Field(foreign_key="cuentas.id_cuenta")
+
+
+class ReservaHist(SQLModel, table=True):
+    __tablename__ = "reservas_hist"
+    id_reserva: int = Field(primary_key=True)
+    file: str = Field(max_length=6)
+    estado: str = Field(max_length=2)
+    moneda: str | None = Field(max_length=1)
+    total: float
+    fecha_pago_proveedor: date | None
+    fecha_in: date | None
+    fecha_out: date | None
+    fecha_sal: date | None
+    hash: bytes = Field(sa_column=Column(BINARY(Paths.HASH_BYTES), unique=True, nullable=False))
+    id_proveedor: int = Field(foreign_key="proveedores.id_proveedor")
+    id_pasajero: int = Field(foreign_key="pasajeros.id_pasajero")
+    codigo_iata: str = Field(max_length=3, foreign_key="iatas.codigo_iata")
+
+
+class SaldoHist(SQLModel, table=True):
+    __tablename__ = "saldos_hist"
+    id_saldo: int = Field(primary_key=True)
+    codigo_transferencia: str | None = Field(max_length=30)
+    tipo_movimiento: str = Field(max_length=1)
+    fecha_pago: date | None
+    descripcion: str | None = Field(max_length=150)
+    moneda_pago: str = Field(max_length=1)
+    monto: float
+    tipo_de_cambio: float
+    comision: float | None
+    impuesto: float | None
+    estado_pago: str | None
+    tipo_de_saldo: str | None
+    id_reserva: int = Field(foreign_key="reservas_hist.id_reserva")
+    id_cuenta: int = Field(foreign_key="cuentas.id_cuenta")
+
+
+class EtlRun(SQLModel, table=True):
+    __tablename__ = "etl_runs"
+    id_run: int | None = Field(default=None, primary_key=True)
+    proceso: str = Field(max_length=20)
+    fecha: datetime
+    reservas_tocadas: int
@@ -0,0 +1,122 @@
+import logging
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from typing import Callable
+
+from Pipeline.etl_excel import main_excel, read_prevision
+from Pipeline.etl_traffic import extract_traffic, main_traffic
+from Pipeline.functions import setup_logging
+
+
+@dataclass
+class Stage:
+    """Nodo del grafo: `fn` recibe como kwargs los resultados de sus dependencias"""
+
+    name: str
+    fn: Callable
+    deps: list = field(default_factory=list)
+    # "thread" para I/O (scraping, BDD); "process" para trabajo de CPU con pandas
+    executor: str = "thread"
+    inicio: float | None = None
+    fin: float | None = None
+
+    @property
+    def duracion(self) -> float:
+        return (self.fin or 0) - (self.inicio or 0)
+
+
+def critical_path(stages: dict) -> list:
+    """Camino de dependencias que determinó el tiempo total (de la primera a la última etapa)"""
+    actual = max(stages.values(), key=lambda s: s.fin)
+    path = [actual]
+    while actual.deps:
+        actual = max((stages[d] for d in actual.deps), key=lambda s: s.fin)
+        path.append(actual)
+    return path[::-1]
+
+
+def run_graph(stages: list) -> dict:
+    """Corre las etapas respetando dependencias; las independientes en paralelo.
+
+    Las etapas que escriben en la BDD se encadenan con `deps`, así el orden de
+    commits (reservas antes que saldos) lo impone el grafo.
+    """
+    logger = logging.getLogger(__name__)
+    by_name = {s.name: s for s in stages}
+    results: dict = {}
+    pendientes = dict(by_name)
+    corriendo: dict = {}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=len(stages)) as threads, ProcessPoolExecutor(
+        max_workers=max(1, sum(s.executor == "process" for s in stages))
+    ) as processes:
+        while pendientes or corriendo:
+            for name, stage in list(pendientes.items()):
+                if all(d in results for d in stage.deps):
+                    pool = processes if stage.executor == "process" else threads
+                    kwargs = {d: results[d] for d in stage.deps}
+                    stage.inicio = time.perf_counter() - start
+                    logger.info(f"▶️ Etapa {name} iniciada")
+                    corriendo[pool.submit(stage.fn, **kwargs)] = stage
+                    del pendientes[name]
+
+            done, _ = wait(corriendo, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = corriendo.pop(future)
+                stage.fin = time.perf_counter() - start
+                try:
+                    results[stage.name] = future.result()
+                except Exception:
+                    logger.error(f"❌ Etapa {stage.name} falló; se cancelan las pendientes")
+                    for f in corriendo:
+                        f.cancel()
+                    raise
+                logger.info(f"⏹️ Etapa {stage.name} terminada en {stage.duracion:.1f} s")
+
+    total = time.perf_counter() - start
+    path = critical_path(by_name)
+    logger.info("=" * 60)
+    logger.info(f"⏰ Tiempo total: {total:.1f} s (suma de etapas: {sum(s.duracion for s in stages):.1f} s)")
+    logger.info(
+        "🧭 Camino crítico: "
+        + " → ".join(f"{s.name} ({s.duracion:.1f} s)" for s in path)
+    )
+    logger.info("=" * 60)
+    return results
+
+
+def _load_reservas(scrape):
+    return main_traffic(data=scrape)
+
+
+def _load_saldos(workbook, reservas):
+    # `reservas` sólo se recibe para forzar el orden: los saldos referencian reservas
+    return main_excel(df=workbook)
+
+
+def full_refresh() -> dict:
+    """Actualización completa: traffic y PREVISION.xlsx en un solo grafo.
+
+    scrape ──→ reservas ──→ saldos
+    workbook ───────────────↗
+    """
+    setup_logging()
+    return run_graph(
+        [
+            Stage("scrape", extract_traffic),
+            Stage("workbook", read_prevision, executor="process"),
+            Stage("reservas", _load_reservas, deps=["scrape"]),
+            Stage("saldos", _load_saldos, deps=["workbook", "reservas"]),
+        ]
+    )
+
+
+if __name__ == "__main__":
+    full_refresh()
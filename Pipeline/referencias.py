@@ -0,0 +1,150 @@
+import logging
+import time
+
+import pandas as pd
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import Session, select
+
+from Pipeline.models import Iata, Reserva
+from Pipeline.resumen import refresh_prevision
+from Pipeline.utils import Paths
+
+# País de las ciudades que en iatas.xlsx vienen sin Idpaises, por nombre de
+# ciudad. None = no se carga (no es una ciudad).
+PAISES_POR_CIUDAD: dict = {
+    "AEROPUERTO DE HONG KONG": "Hong Kong",
+    "AL AIN": "Emiratos Árabes Unidos",
+    "BEIRUT": "Líbano",
+    "BROUMANA": "Líbano",
+    "CAVTAT": "Croacia",
+    "CRES": "Croacia",
+    "CRUCEROS": None,
+    "CURACAO": "Curazao",
+    "HONG KONG": "Hong Kong",
+    "HONG KONG CHEUNG CHAU": "Hong Kong",
+    "HONG KONG SUR": "Hong Kong",
+    "HONG KONG TSING YI": "Hong Kong",
+    "HVAR": "Croacia",
+    "ISTRIA": "Croacia",
+    "JOUNIEH": "Líbano",
+    "KFARDEBIANE": "Líbano",
+    "KOLOCEP": "Croacia",
+    "KORENICA": "Croacia",
+    "KOWLOON": "Hong Kong",
+    "KVARNER BAY": "Croacia",
+    "LITTLE CAYMAN": "Islas Caimán",
+    "MACAU": "Macao",
+    "OMIS": "Croacia",
+    "OPATIJA": "Croacia",
+    "OREBIC": "Croacia",
+    "PLITVICE PARQUE NACIONAL": "Croacia",
+    "POREC": "Croacia",
+    "PULA": "Croacia",
+    "RAS AL KHAYMAH": "Emiratos Árabes Unidos",
+    "RIJEKA": "Croacia",
+    "ROVINJ": "Croacia",
+    "SAMANA": "República Dominicana",
+    "SAN MAARTEN-OYSTER PO": "Sint Maarten",
+    "SHATIN": "Hong Kong",
+    "SIBENIK": "Croacia",
+    "SOLIN": "Croacia",
+    "SPLIT": "Croacia",
+    "SPLIT-MIDDLE DALMATIA": "Croacia",
+    "STARI GRAD (HVAR)": "Croacia",
+    "TINSHUIWAI": "Hong Kong",
+    "TRIPOLI (LB)": "Líbano",
+    "TROGIR": "Croacia",
+    "TSUEN WAN": "Hong Kong",
+    "TUEN MUN": "Hong Kong",
+    "VODICE": "Croacia",
+    "VRSAR": "Croacia",
+    "WEST YELLOWSTONE": "Estados Unidos",
+    "ZADAR-NORTH DALMATIA": "Croacia",
+}
+
+# Overrides por código, para filas sin nombre de ciudad
+PAISES_POR_CODIGO: dict = {
+    "EXT": "Reino Unido",  # Exeter
+}
+
+
+def read_iatas(path: str = Paths.IATA_PATH) -> pd.DataFrame:
+    """Lee iatas.xlsx y devuelve codigo_iata/pais listo para cargar"""
+    df = pd.read_excel(path, usecols=["Codigociudad", "Nombreciudad", "Idpaises"])
+
+    ciudad = df["Nombreciudad"].astype("string").str.strip().str.upper()
+    override = (
+        ciudad.map(PAISES_POR_CIUDAD)
+        .fillna(df["Codigociudad"].map(PAISES_POR_CODIGO))
+        .str.upper()
+    )
+    faltantes = df["Idpaises"].isna()
+    df.loc[faltantes, "Idpaises"] = override[faltantes]
+
+    sin_pais = df.loc[df["Idpaises"].isna(), "Nombreciudad"].dropna().unique()
+    if len(sin_pais):
+        logging.warning(f"⚠️ Ciudades sin país (se omiten): {', '.join(map(str, sin_pais))}")
+
+    data = df.dropna(subset=["Codigociudad", "Idpaises"])
+    data = pd.DataFrame(
+        {
+            "codigo_iata": data["Codigociudad"].astype(str).str.strip(),
+            "pais": data["Idpaises"].astype(str).str.replace("?", "N"),
+        }
+    )
+    return data.drop_duplicates(subset="codigo_iata", keep="last")
+
+
+def load_iatas(session: Session, data: pd.DataFrame, chunk: int = 5000) -> dict:
+    """Upsert de la tabla iatas; sólo escribe códigos nuevos o con país distinto.
+
+    Si algún país cambió, refresca en la misma transacción las filas de
+    gabi_prevision_mat de las reservas con esos códigos (pais/origen salen del
+    join) y lo registra como un run "iatas". Devuelve la cantidad de
+    insertados, actualizados, sin cambios y reservas refrescadas.
+    """
+    actuales = dict(session.exec(select(Iata.codigo_iata, Iata.pais)).all())
+    previo = data["codigo_iata"].map(actuales)
+    nuevos = previo.isna()
+    cambiados = ~nuevos & (previo != data["pais"])
+    counts = {
+        "insertados": int(nuevos.sum()),
+        "actualizados": int(cambiados.sum()),
+        "sin_cambios": int((~nuevos & ~cambiados).sum()),
+    }
+
+    rows = data[nuevos | cambiados].to_dict("records")
+    for i in range(0, len(rows), chunk):
+        stmt = insert(Iata).values(rows[i : i + chunk])
+        session.exec(stmt.on_duplicate_key_update(pais=stmt.inserted.pais))
+
+    counts["reservas_refrescadas"] = 0
+    codigos = data.loc[cambiados, "codigo_iata"].tolist()
+    if codigos:
+        reservas = set()
+        for i in range(0, len(codigos), chunk):
+            reservas.update(
+                session.exec(
+                    select(Reserva.id_reserva).where(
+                        Reserva.codigo_iata.in_(codigos[i : i + chunk])
+                    )
+                ).all()
+            )
+        refresh_prevision(session, reservas, "iatas")
+        counts["reservas_refrescadas"] = len(reservas)
+    return counts
+
+
+def init_iatas(path: str = Paths.IATA_PATH) -> dict:
+    """Carga (o recarga) el catálogo de IATAs desde el Excel de referencia"""
+    start = time.perf_counter()
+    data = read_iatas(path)
+    with Session(Paths.ENGINE) as session:
+        counts = load_iatas(session, data)
+        session.commit()
+    logging.info(
+        f"✅ IATAs: {counts['insertados']} insertados, {counts['actualizados']} actualizados, "
+        f"{counts['sin_cambios']} sin cambios, {counts['reservas_refrescadas']} reservas "
+        f"refrescadas en gabi_prevision ({time.perf_counter() - start:.2f} s)"
+    )
+    return counts
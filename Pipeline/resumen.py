@@ -0,0 +1,134 @@
+import argparse
+import logging
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import bindparam
+from sqlmodel import Session, text
+
+from Pipeline.models import EtlRun
+from Pipeline.utils import Paths
+
+COLUMNAS: list = [
+    "id_reserva",
+    "file",
+    "estado",
+    "moneda",
+    "total",
+    "fecha_pago_proveedor",
+    "fecha_in",
+    "fecha_out",
+    "nombre_proveedor",
+    "nombre_pasajero",
+    "pais",
+    "origen",
+    "codigo_transferencia",
+    "tipo_movimiento",
+    "fecha_pago",
+    "descripcion",
+    "moneda_pago",
+    "monto",
+    "tipo_de_cambio",
+    "comision",
+    "impuesto",
+    "estado_pago",
+    "tipo_de_saldo",
+    "banco",
+]
+
+_COLS = ", ".join(COLUMNAS)
+DELETE_MAT = text(
+    "DELETE FROM gabi_prevision_mat WHERE id_reserva IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+INSERT_MAT = text(
+    f"INSERT INTO gabi_prevision_mat ({_COLS}, id_run) "
+    f"SELECT {_COLS}, :id_run FROM gabi_prevision_base WHERE id_reserva IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+
+def refresh_prevision(
+    session: Session, reservas: set, proceso: str, chunk: int = 1000
+) -> EtlRun:
+    """Refresca gabi_prevision_mat sólo para las reservas que tocó la corrida.
+
+    Corre dentro de la transacción del ETL (antes del commit), así el
+    materializado nunca queda desfasado de reservas/saldos.
+    """
+    run = EtlRun(proceso=proceso, fecha=datetime.now(), reservas_tocadas=len(reservas))
+    session.add(run)
+    session.flush()
+
+    ids = sorted(reservas)
+    for i in range(0, len(ids), chunk):
+        params = {"ids": ids[i : i + chunk], "id_run": run.id_run}
+        session.exec(DELETE_MAT, params=params)
+        session.exec(INSERT_MAT, params=params)
+    return run
+
+
+def rebuild_prevision(session: Session) -> int:
+    """Reconstruye el materializado completo (p. ej. después de editar a mano)"""
+    run = EtlRun(proceso="rebuild", fecha=datetime.now(), reservas_tocadas=0)
+    session.add(run)
+    session.flush()
+    session.exec(text("DELETE FROM gabi_prevision_mat"))
+    result = session.exec(
+        text(
+            f"INSERT INTO gabi_prevision_mat ({_COLS}, id_run) "
+            f"SELECT {_COLS}, :id_run FROM gabi_prevision_base"
+        ),
+        params={"id_run": run.id_run},
+    )
+    run.reservas_tocadas = result.rowcount
+    return result.rowcount
+
+
+def check_consistency(engine=Paths.ENGINE) -> dict:
+    """Compara gabi_prevision (materializado) contra el join en vivo"""
+    with engine.connect() as conn:
+        mat = pd.read_sql(text(f"SELECT {_COLS} FROM gabi_prevision"), conn)
+        live = pd.read_sql(text(f"SELECT {_COLS} FROM gabi_prevision_live"), conn)
+
+    merged = mat.astype(str).merge(live.astype(str), how="outer", indicator=True)
+    return {
+        "filas_mat": len(mat),
+        "filas_live": len(live),
+        "solo_mat": int((merged["_merge"] == "left_only").sum()),
+        "solo_live": int((merged["_merge"] == "right_only").sum()),
+    }
+
+
+def read_latency(engine=Paths.ENGINE, repeticiones: int = 10) -> dict:
+    """Mediana de segundos para leer toda la vista, materializada vs en vivo"""
+    result = {}
+    with engine.connect() as conn:
+        for vista in ("gabi_prevision", "gabi_prevision_live"):
+            tiempos = []
+            for _ in range(repeticiones):
+                start = time.perf_counter()
+                conn.execute(text(f"SELECT {_COLS} FROM {vista}")).fetchall()
+                tiempos.append(time.perf_counter() - start)
+            result[vista] = sorted(tiempos)[len(tiempos) // 2]
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Materializado de gabi_prevision")
+    parser.add_argument("accion", choices=["check", "rebuild", "bench"])
+    args = parser.parse_args()
+
+    if args.accion == "rebuild":
+        with Session(Paths.ENGINE) as session:
+            filas = rebuild_prevision(session)
+            session.commit()
+        logging.info(f"✅ Materializado reconstruido: {filas} filas")
+    elif args.accion == "check":
+        resultado = check_consistency()
+        logging.info(f"📊 Consistencia: {resultado}")
+        if resultado["solo_mat"] or resultado["solo_live"]:
+            raise SystemExit(1)
+    else:
+        for vista, segundos in read_latency().items():
+            logging.info(f"⏱️ {vista}: {segundos * 1000:.1f} ms")
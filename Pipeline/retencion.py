@@ -0,0 +1,106 @@
+import argparse
+import logging
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import bindparam
+from sqlmodel import Session, text
+
+from Pipeline.functions import setup_logging
+from Pipeline.models import EtlRun
+from Pipeline.utils import Paths
+
+# Reservas con fecha_pago_proveedor anterior a hoy - RETENCION_DIAS se archivan
+RETENCION_DIAS = 180
+
+_RESERVAS = (
+    "id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in, "
+    "fecha_out, fecha_sal, id_proveedor, id_pasajero, codigo_iata, hash"
+)
+_SALDOS = (
+    "id_saldo, codigo_transferencia, tipo_movimiento, fecha_pago, descripcion, "
+    "moneda_pago, monto, tipo_de_cambio, comision, impuesto, estado_pago, "
+    "tipo_de_saldo, id_reserva, id_cuenta"
+)
+
+
+def _por_ids(sql: str):
+    return text(sql).bindparams(bindparam("ids", expanding=True))
+
+
+SELECT_LOTE = text(
+    "SELECT id_reserva FROM reservas WHERE fecha_pago_proveedor < :corte "
+    "ORDER BY id_reserva LIMIT :lote FOR UPDATE"
+)
+# El orden respeta las FKs: reserva archivada antes que sus saldos, saldos
+# borrados antes que la reserva.
+PASOS = [
+    ("reservas_hist", _por_ids(
+        f"INSERT INTO reservas_hist ({_RESERVAS}) "
+        f"SELECT {_RESERVAS} FROM reservas WHERE id_reserva IN :ids"
+    )),
+    ("saldos_hist", _por_ids(
+        f"INSERT INTO saldos_hist ({_SALDOS}) "
+        f"SELECT {_SALDOS} FROM saldos WHERE id_reserva IN :ids"
+    )),
+    ("saldos", _por_ids("DELETE FROM saldos WHERE id_reserva IN :ids")),
+    ("gabi_prevision_mat", _por_ids("DELETE FROM gabi_prevision_mat WHERE id_reserva IN :ids")),
+    ("reservas", _por_ids("DELETE FROM reservas WHERE id_reserva IN :ids")),
+]
+
+
+def archive(
+    dias: int = RETENCION_DIAS,
+    lote: int = 5000,
+    engine=Paths.ENGINE,
+    hoy: date | None = None,
+) -> dict:
+    """Mueve reservas vencidas hace más de `dias` (y sus saldos) a las tablas *_hist.
+
+    Cada lote es una transacción: o se archiva completo o no se toca nada, así
+    nunca queda un saldo sin su reserva. Las filas del materializado de esas
+    reservas se borran en el mismo lote (ya estaban fuera de gabi_prevision) y
+    el lote queda registrado en etl_runs, así los consumidores del
+    materializado (ForecastEngine) se enteran de que hubo cambios.
+    Para reportes históricos: vista gabi_prevision_historica.
+    """
+    logger = logging.getLogger(__name__)
+    corte = (hoy or date.today()) - timedelta(days=dias)
+    totales = {"lotes": 0, "reservas": 0, "saldos": 0}
+    start = time.perf_counter()
+
+    while True:
+        with Session(engine) as session:
+            ids = session.exec(SELECT_LOTE, params={"corte": corte, "lote": lote}).scalars().all()
+            if not ids:
+                break
+            movidas = {}
+            for tabla, stmt in PASOS:
+                movidas[tabla] = session.exec(stmt, params={"ids": ids}).rowcount
+            session.add(
+                EtlRun(proceso="retencion", fecha=datetime.now(), reservas_tocadas=len(ids))
+            )
+            session.commit()
+
+        totales["lotes"] += 1
+        totales["reservas"] += movidas["reservas_hist"]
+        totales["saldos"] += movidas["saldos_hist"]
+        logger.info(
+            f"   📦 Lote {totales['lotes']}: {movidas['reservas_hist']} reservas, "
+            f"{movidas['saldos_hist']} saldos archivados"
+        )
+
+    logger.info(
+        f"✅ Retención (corte {corte}): {totales['reservas']} reservas y "
+        f"{totales['saldos']} saldos archivados en {time.perf_counter() - start:.1f} s"
+    )
+    return totales
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archiva reservas y saldos vencidos")
+    parser.add_argument("--dias", type=int, default=RETENCION_DIAS)
+    parser.add_argument("--lote", type=int, default=5000)
+    args = parser.parse_args()
+    setup_logging()
+    archive(args.dias, args.lote)
@@ -1,26 +1,137 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import logging
+import re
 import time
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import datetime
 from dateutil.relativedelta import relativedelta
+from concurrent.futures import ThreadPoolExecutor
+from Pipeline.incremental import IncrementalState, fingerprint
+from Pipeline.utils import Paths
 
+try:
+    # orjson decodifica directo desde bytes y bastante más rápido que json
+    from orjson import loads
+except ImportError:
+    from json import loads
 
-def main_scraper() -> pd.DataFrame:
-    # Rutas
-    URL_LOGIN = "https://traffic.welcomelatinamerica.com/iTraffic_TSA/Account/Login?ReturnUrl=%2fiTraffic_TSA%2f"
-    URL_DATA = "https://traffic.welcomelatinamerica.com/iTraffic_TSA/Services/Z_Reportes/SaldoAutoriza_List/List"
+# Rutas
+URL_BASE = Paths.TRAFFIC_URL
+URL_LOGIN = f"{URL_BASE}/iTraffic_TSA/Account/Login?ReturnUrl=%2fiTraffic_TSA%2f"
+URL_DATA = f"{URL_BASE}/iTraffic_TSA/Services/Z_Reportes/SaldoAutoriza_List/List"
+URL_AUTH = f"{URL_BASE}/iTraffic_TSA/Account/Login"
 
-    # Datos de login
-    USERNAME = ""
-    PASSWORD = ""
+# Datos de login
+USERNAME = ""
+PASSWORD = ""
+
+# Cabeceras
+HEADERS = {
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "Content-Type": "application/json",
+    "X-Requested-With": "XMLHttpRequest",
+    "Origin": URL_BASE,
+    "Referer": URL_DATA,
+    "User-Agent": "Mozilla/5.0",
+}
+
+# Token anti-forgery: Serenity lo manda como cookie y como input oculto
+COOKIE_CSRF = "CSRF-TOKEN"
+TOKEN_RE = re.compile(r'name="__RequestVerificationToken"[^>]*value="([^"]+)"')
+
+logger = logging.getLogger(__name__)
+
+# Segundos de conexión y de lectura por request: sin timeout un request
+# colgado deja al worker esperando para siempre
+TIMEOUT = (10, 60)
+
+# Reintentos ante errores 5xx, de conexión o timeout
+REINTENTOS = 3
+ESPERA_REINTENTO = 0.5  # segundos, se duplica en cada intento
+
+
+def configure(base_url: str) -> None:
+    """Cambia el servidor de traffic (p. ej. el stand-in local) en tiempo de ejecución"""
+    global URL_BASE, URL_LOGIN, URL_DATA, URL_AUTH
+    URL_BASE = base_url.rstrip("/")
+    URL_LOGIN = f"{URL_BASE}/iTraffic_TSA/Account/Login?ReturnUrl=%2fiTraffic_TSA%2f"
+    URL_DATA = f"{URL_BASE}/iTraffic_TSA/Services/Z_Reportes/SaldoAutoriza_List/List"
+    URL_AUTH = f"{URL_BASE}/iTraffic_TSA/Account/Login"
+    HEADERS["Origin"] = URL_BASE
+    HEADERS["Referer"] = URL_DATA
+
+
+COLS: list = [
+    "rva",
+    "estadoope",
+    "monedalocal",
+    "Fec_in",
+    "Fec_out",
+    "Descrip",
+    "saldo",
+    "nombre",
+    "ciudad",
+    "fec_sal",
+    "fec_vencop",
+]
+
+COLUMNS: dict = {
+    "rva": "file",
+    "estadoope": "estado",
+    "monedalocal": "moneda",
+    "Fec_in": "fecha_in",
+    "Fec_out": "fecha_out",
+    "fec_sal": "fecha_sal",
+    "fec_vencop": "fecha_pago_proveedor",
+    "Descrip": "pasajero",
+    "saldo": "total",
+    "nombre": "proveedor",
+    "ciudad": "codigo_iata",
+}
+
+
+def login_http(session: requests.Session | None = None) -> dict:
+    """Ingresa a traffic sin navegador: el mismo flujo que hace el botón de la página.
+
+    GET de la página de login (deja la cookie anti-forgery), POST de las
+    credenciales en JSON con el token en X-CSRF-TOKEN. Las cookies quedan en
+    `session`, así que se puede seguir usando para las consultas.
+    """
+    session = session or requests.Session()
+    page = session.get(URL_LOGIN, headers={"User-Agent": HEADERS["User-Agent"]}, timeout=TIMEOUT)
+    page.raise_for_status()
+
+    token = session.cookies.get(COOKIE_CSRF)
+    if token is None:
+        match = TOKEN_RE.search(page.text)
+        token = match.group(1) if match else None
+    if token is None:
+        raise ValueError("La página de login no tiene token anti-forgery")
+
+    response = session.post(
+        URL_AUTH,
+        headers={**HEADERS, "Referer": URL_LOGIN, "X-CSRF-TOKEN": token},
+        json={"Username": USERNAME, "Password": PASSWORD},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    cookies = session.cookies.get_dict()
+    if set(cookies) <= {COOKIE_CSRF}:
+        raise ValueError("El login no devolvió cookie de sesión")
+    logger.info("Ingreso (HTTP).")
+    return cookies
+
+
+def login_selenium() -> dict:
+    """Ingresa a traffic con Selenium y devuelve las cookies de la sesión"""
+    # Import diferido: Chrome sólo se carga si el login HTTP falla
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
 
-    FECHA_HOY = datetime.datetime.now()
-    FECHA_TOP = FECHA_HOY + relativedelta(months=3)
     # 1️⃣ Inicializar Selenium
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")  # maximiza ventana
@@ -29,116 +140,295 @@ def main_scraper() -> pd.DataFrame:
     options.add_argument("--window-size=1920,1080")  # tamaño de la ventana
 
     driver = webdriver.Chrome(options=options)
-    # 2️⃣ Abrir la página de login
-
-    driver.get(URL_LOGIN)
-    logging.info("Ingresando a traffic...")
-    wait = WebDriverWait(driver, 15)
+    try:
+        # 2️⃣ Abrir la página de login
+        driver.get(URL_LOGIN)
+        logger.info("Ingresando a traffic...")
+        wait = WebDriverWait(driver, 15)
 
-    # Espera el campo usuario
-    username_input = wait.until(
-        EC.presence_of_element_located(
-            (By.ID, "Softur_Serene_Membership_LoginPanel0_Username")
+        # Espera el campo usuario
+        username_input = wait.until(
+            EC.presence_of_element_located(
+                (By.ID, "Softur_Serene_Membership_LoginPanel0_Username")
+            )
         )
-    )
-    username_input.send_keys(USERNAME)
+        username_input.send_keys(USERNAME)
 
-    # Espera el campo contraseña
-    password_input = wait.until(
-        EC.presence_of_element_located(
-            (By.ID, "Softur_Serene_Membership_LoginPanel0_Password")
+        # Espera el campo contraseña
+        password_input = wait.until(
+            EC.presence_of_element_located(
+                (By.ID, "Softur_Serene_Membership_LoginPanel0_Password")
+            )
         )
-    )
-    password_input.send_keys(PASSWORD)
+        password_input.send_keys(PASSWORD)
 
-    # Espera el botón login
-    login_button = wait.until(
-        EC.element_to_be_clickable(
-            (By.ID, "Softur_Serene_Membership_LoginPanel0_LoginButton")
+        # Espera el botón login
+        login_button = wait.until(
+            EC.element_to_be_clickable(
+                (By.ID, "Softur_Serene_Membership_LoginPanel0_LoginButton")
+            )
         )
-    )
-    login_button.click()
-    # Cookies obtenidas de Selenium
-    logging.info("Ingreso.")
-    time.sleep(20)
-    selenium_cookies = driver.get_cookies()
-    cookies = {c["name"]: c["value"] for c in selenium_cookies}
-
-    # Cabeceras
-    headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "Content-Type": "application/json",
-        "X-Requested-With": "XMLHttpRequest",
-        "Origin": "https://traffic.welcomelatinamerica.com",
-        "Referer": URL_DATA,
-        "User-Agent": "Mozilla/5.0",
+        login_button.click()
+        # Espera a salir de la página de login (como máximo lo que antes era un sleep fijo)
+        try:
+            WebDriverWait(driver, 20).until(
+                lambda d: "Account/Login" not in d.current_url
+            )
+        except TimeoutException:
+            logger.warning("No se detectó la redirección del login, se sigue igual")
+        # Cookies obtenidas de Selenium
+        logger.info("Ingreso.")
+        selenium_cookies = driver.get_cookies()
+    finally:
+        driver.quit()
+    return {c["name"]: c["value"] for c in selenium_cookies}
+
+
+def login(session: requests.Session | None = None) -> dict:
+    """Login por HTTP; si falla, cae al navegador con Selenium"""
+    try:
+        return login_http(session)
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"⚠️ Login HTTP falló ({str(e)}), se intenta con Selenium")
+    cookies = login_selenium()
+    if session is not None:
+        session.cookies.update(cookies)
+    return cookies
+
+
+def fetch_page(
+    session: requests.Session,
+    cookies: dict,
+    desde: datetime.date,
+    hasta: datetime.date,
+    skip: int,
+    take: int,
+) -> requests.Response | None:
+    """Pide una página del reporte SaldoAutoriza para la ventana [desde, hasta]"""
+    payload = {
+        "Take": take,
+        "Skip": skip,
+        "EqualityFilter": {},
+        "cod_oper": None,
+        "cod_vdor": None,
+        "tiposaldo": "",
+        "tipocc": None,
+        "moneda": "",
+        "estadoRva": "",
+        "fec_Compdesde": desde.strftime("%Y/%m/%d"),
+        "fec_CompHasta": hasta.strftime("%Y/%m/%d"),
     }
 
-    session = requests.Session()
-    all_data = []
-    take = 100  # filas por request
-    skip = 0
+    status = "conexión"
+    for intento in range(REINTENTOS + 1):
+        try:
+            response = session.post(
+                URL_DATA, headers=HEADERS, cookies=cookies, json=payload, timeout=TIMEOUT
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            logger.debug(f"Error de conexión (intento {intento + 1}): {str(e)}")
+        else:
+            if response.status_code == 200:
+                return response
+            status = response.status_code
+            logger.debug(f"Error, status: {status}")
+            if status < 500:
+                break  # 4xx: reintentar no cambia nada (p. ej. sesión vencida)
 
-    while True:
-        payload = {
-            "Take": take,
-            "Skip": skip,
-            "EqualityFilter": {},
-            "cod_oper": None,
-            "cod_vdor": None,
-            "tiposaldo": "",
-            "tipocc": None,
-            "moneda": "",
-            "estadoRva": "",
-            "fec_Compdesde": FECHA_HOY.strftime("%Y/%m/%d"),
-            "fec_CompHasta": FECHA_TOP.strftime("%Y/%m/%d"),
-        }
-
-        response = session.post(
-            URL_DATA, headers=headers, cookies=cookies, json=payload
+        if intento < REINTENTOS:
+            time.sleep(ESPERA_REINTENTO * 2**intento)
+
+    logger.error(f"❌ No se pudo leer la página skip={skip} ({desde} → {hasta}): {status}")
+    return None
+
+
+class ColumnBuffer:
+    """Acumula las filas por columna, ya con los nombres finales.
+
+    De cada entidad sólo se copian los 11 campos que se usan; los dicts de la
+    página se descartan apenas se procesan, en vez de juntar todas las filas en
+    una lista de dicts.
+    """
+
+    def __init__(self):
+        self.columns: dict = {COLUMNS[c]: [] for c in COLS}
+        self.rows = 0
+
+    def append(self, entities: list) -> None:
+        for src in COLS:
+            self.columns[COLUMNS[src]].extend([e.get(src) for e in entities])
+        self.rows += len(entities)
+
+    def extend(self, other: "ColumnBuffer") -> None:
+        for name, values in other.columns.items():
+            self.columns[name].extend(values)
+        self.rows += other.rows
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns, columns=list(self.columns))
+
+
+def fetch_window(
+    session: requests.Session,
+    cookies: dict,
+    desde: datetime.date,
+    hasta: datetime.date,
+    take: int = 100,
+    concurrencia: int = 1,
+    strict: bool = False,
+) -> ColumnBuffer:
+    """Trae todas las filas de la ventana, página por página.
+
+    Con `concurrencia` > 1 se usa el TotalCount de la primera página para pedir
+    el resto en paralelo; las páginas se acumulan en orden de Skip igual.
+    Con `strict` una página fallida levanta error en vez de cortar la ventana.
+    """
+    if concurrencia > 1:
+        return _fetch_window_parallel(
+            session, cookies, desde, hasta, take, concurrencia
         )
 
-        if response.status_code != 200:
-            logging.debug(f"Error, status: {response.status_code}")
-            print("Error:", response.status_code)
-            break
+    buffer = ColumnBuffer()
+    skip = 0
 
+    while True:
+        response = fetch_page(session, cookies, desde, hasta, skip, take)
+        if response is None:
+            if strict:
+                raise RuntimeError(f"No se pudo leer la página skip={skip}")
+            break
 
-        data = response.json().get("Entities", [])
+        data = loads(response.content).get("Entities", [])
         if not data:
             break  # No quedan más filas
 
-        all_data.extend(data)
+        buffer.append(data)
         skip += take
-        print(f"Traído {len(data)} filas, total acumulado: {len(all_data)}")
-    driver.quit()
-    cols: list = [
-        "rva",
-        "estadoope",
-        "monedalocal",
-        "Fec_in",
-        "Fec_out",
-        "Descrip",
-        "saldo",
-        "nombre",
-        "ciudad",
-        "fec_sal",
-        "fec_vencop",
-    ]
-    data = pd.DataFrame(all_data, columns=cols)
-
-    columns = {
-        "rva": "file",
-        "estadoope": "estado",
-        "monedalocal": "moneda",
-        "Fec_in": "fecha_in",
-        "Fec_out": "fecha_out",
-        "fec_sal": "fecha_sal",
-        "fec_vencop": "fecha_pago_proveedor",
-        "Descrip": "pasajero",
-        "saldo": "total",
-        "nombre": "proveedor",
-        "ciudad": "codigo_iata",
-    }
-    data.rename(columns=columns, inplace=True)
-    return data
+        logger.debug(f"Traído {len(data)} filas, total acumulado: {buffer.rows}")
+    return buffer
+
+
+def _fetch_window_parallel(
+    session: requests.Session,
+    cookies: dict,
+    desde: datetime.date,
+    hasta: datetime.date,
+    take: int,
+    concurrencia: int,
+) -> ColumnBuffer:
+    adapter = HTTPAdapter(pool_maxsize=concurrencia)
+    session.mount(URL_BASE, adapter)
+
+    buffer = ColumnBuffer()
+    response = fetch_page(session, cookies, desde, hasta, 0, take)
+    if response is None:
+        return buffer
+    body = loads(response.content)
+    buffer.append(body.get("Entities", []))
+    total = body.get("TotalCount")
+    if total is None:
+        raise RuntimeError("La respuesta no trae TotalCount, usar concurrencia=1")
+
+    def page(skip: int) -> list:
+        response = fetch_page(session, cookies, desde, hasta, skip, take)
+        if response is None:
+            raise RuntimeError(f"No se pudo leer la página skip={skip}")
+        return loads(response.content).get("Entities", [])
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        for data in executor.map(page, range(take, total, take)):
+            buffer.append(data)
+    logger.info(f"Traídas {buffer.rows} filas de {total}")
+    return buffer
+
+
+def fetch_shards(
+    session: requests.Session,
+    cookies: dict,
+    desde: datetime.date,
+    hasta: datetime.date,
+    state: IncrementalState,
+    take: int = 100,
+) -> ColumnBuffer:
+    """Trae la ventana por shards de fechas, omitiendo los que no cambiaron.
+
+    De cada shard se bajan todas las páginas (hasta el TotalCount de la
+    primera, o hasta una vacía si no lo trae); si todas las huellas coinciden
+    con la corrida anterior el shard no se devuelve (no se vuelve a cargar en
+    la BDD). Comparar sólo la primera página dejaría pasar cambios en las
+    siguientes.
+    """
+    buffer = ColumnBuffer()
+    shards = state.split(desde, hasta)
+    logger.info(
+        f"Extracción {'completa' if state.full_refresh else 'incremental'}: {len(shards)} shards"
+    )
+
+    for key, shard_desde, shard_hasta in shards:
+        shard_buffer = ColumnBuffer()
+        paginas = []
+        total = None
+        skip = 0
+        while True:
+            response = fetch_page(session, cookies, shard_desde, shard_hasta, skip, take)
+            if response is None:
+                raise RuntimeError(f"No se pudo leer el shard {key} (skip={skip})")
+            body = loads(response.content)
+            data = body.get("Entities", [])
+            if skip == 0:
+                total = body.get("TotalCount")
+            if not data:
+                break
+            paginas.append(fingerprint(response.content))
+            shard_buffer.append(data)
+            skip += take
+            if total is not None and skip >= total:
+                break  # Sin pedir la página vacía del final
+
+        if state.unchanged(key, paginas):
+            state.record(key, paginas, changed=False)
+            continue
+
+        state.record(key, paginas, changed=True)
+        buffer.extend(shard_buffer)
+        logger.info(f"Shard {key}: {shard_buffer.rows} filas, total acumulado: {buffer.rows}")
+
+    logger.info(
+        f"Shards procesados: {state.stats['procesados']} | sin cambios: {state.stats['sin_cambios']}"
+    )
+    return buffer
+
+
+def session_alive(session: requests.Session, cookies: dict) -> bool:
+    """Pide una fila para verificar que las cookies siguen siendo válidas"""
+    hoy = datetime.date.today()
+    response = fetch_page(session, cookies, hoy, hoy, 0, 1)
+    return response is not None
+
+
+def main_scraper(
+    state: IncrementalState | None = None,
+    concurrencia: int = 1,
+    cookies: dict | None = None,
+    session: requests.Session | None = None,
+) -> pd.DataFrame:
+    """Extrae el reporte de hoy a tres meses.
+
+    Con `state` la extracción es incremental: sólo se devuelven las filas de los
+    shards que cambiaron desde la última corrida guardada en el estado.
+    Con `cookies`/`session` se reutiliza una sesión ya autenticada.
+    """
+    FECHA_HOY = datetime.datetime.now()
+    FECHA_TOP = FECHA_HOY + relativedelta(months=3)
+
+    session = session or requests.Session()
+    cookies = cookies or login(session)
+    if state is None:
+        buffer = fetch_window(
+            session, cookies, FECHA_HOY, FECHA_TOP, concurrencia=concurrencia
+        )
+    else:
+        buffer = fetch_shards(
+            session, cookies, FECHA_HOY.date(), FECHA_TOP.date(), state
+        )
+    return buffer.to_frame()
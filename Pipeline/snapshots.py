@@ -0,0 +1,117 @@
+import glob
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+
+from Pipeline.utils import Paths
+
+# Sin compresión los buffers se leen directo del mmap, sin copia; "lz4" ocupa
+# menos disco pero obliga a descomprimir (copiar) en cada lectura.
+COMPRESION: str | None = None
+# Metadata del schema: "completo" o "parcial" (corrida incremental, sólo los
+# shards que cambiaron). Los parciales no sirven para replay ni diff.
+EXTRACTO = b"extracto"
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    """Convierte a Arrow; columnas con tipos mezclados se guardan como texto"""
+    columns = {}
+    for col in df.columns:
+        try:
+            columns[col] = pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columns[col] = pa.array(
+                df[col].map(lambda v: None if pd.isna(v) else str(v)), type=pa.string()
+            )
+    return pa.table(columns)
+
+
+def save_snapshot(
+    df: pd.DataFrame,
+    base: str = Paths.SNAPSHOTS,
+    now: datetime | None = None,
+    compression: str | None = COMPRESION,
+    parcial: bool = False,
+) -> str:
+    """Guarda el extracto crudo en Arrow IPC, particionado por fecha de corrida"""
+    now = now or datetime.now()
+    folder = os.path.join(base, f"fecha={now:%Y-%m-%d}")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"traffic_{now:%H%M%S%f}.arrow")
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(folder, f"traffic_{now:%H%M%S%f}_{n}.arrow")
+        n += 1
+
+    table = _to_table(df).replace_schema_metadata(
+        {EXTRACTO: b"parcial" if parcial else b"completo"}
+    )
+    tmp = f"{path}.tmp"
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    logging.info(
+        f"📦 Snapshot {'parcial' if parcial else 'completo'} guardado: {path} ({table.num_rows} filas)"
+    )
+    return path
+
+
+def is_partial(path: str) -> bool:
+    """True si el snapshot es de una corrida incremental (sólo lee el schema)"""
+    with pa.memory_map(path, "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return metadata.get(EXTRACTO) == b"parcial"
+
+
+def list_snapshots(base: str = Paths.SNAPSHOTS) -> list[str]:
+    """Snapshots disponibles, del más viejo al más nuevo"""
+    return sorted(glob.glob(os.path.join(base, "fecha=*", "traffic_*.arrow")))
+
+
+def latest_snapshot(base: str = Paths.SNAPSHOTS, completo: bool = True) -> str:
+    """Último snapshot (por defecto, el último completo)"""
+    for path in reversed(list_snapshots(base)):
+        if not completo or not is_partial(path):
+            return path
+    raise FileNotFoundError(f"No hay snapshots{' completos' if completo else ''} en {base}")
+
+
+def _require_complete(path: str) -> None:
+    if is_partial(path):
+        raise ValueError(
+            f"{path} es un snapshot parcial (corrida incremental): no tiene el extracto completo"
+        )
+
+
+def read_table(path: str) -> pa.Table:
+    """Lee el snapshot con memory-map (sin pasar el archivo por buffers de Python)"""
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def load_snapshot(path: str | None = None, base: str = Paths.SNAPSHOTS) -> pd.DataFrame:
+    """Devuelve el DataFrame tal como lo entregó `main_scraper` en esa corrida.
+
+    Sólo snapshots completos: un parcial cargado como extracto completo haría
+    creer que el resto de las reservas desaparecieron.
+    """
+    path = path or latest_snapshot(base)
+    _require_complete(path)
+    logging.info(f"📦 Reproduciendo snapshot: {path}")
+    return read_table(path).to_pandas(split_blocks=True)
+
+
+def diff_snapshots(old: str, new: str) -> dict:
+    """Filas que aparecen sólo en uno de los dos snapshots"""
+    df_old = load_snapshot(old).astype(str)
+    df_new = load_snapshot(new).astype(str)
+    merged = df_old.merge(df_new, how="outer", indicator=True)
+    return {
+        "eliminadas": merged[merged["_merge"] == "left_only"].drop(columns="_merge"),
+        "agregadas": merged[merged["_merge"] == "right_only"].drop(columns="_merge"),
+    }
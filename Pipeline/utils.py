@@ -1,3 +1,4 @@
+import os
 from sqlmodel import create_engine
 
 
@@ -12,3 +13,21 @@ class Paths:
     IATA_PATH: str = (
         r"C:\Users\jsaldano\Documents\Procesar\Pipeline\Archivos\iatas.xlsx"
     )
+    ESTADO_TRAFFIC: str = (
+        r"C:\Users\jsaldano\Documents\Procesar\Pipeline\Archivos\estado_traffic.json"
+    )
+    SNAPSHOTS: str = r"C:\Users\jsaldano\Documents\Procesar\Pipeline\Archivos\snapshots"
+    BACKFILL: str = r"C:\Users\jsaldano\Documents\Procesar\Pipeline\Archivos\backfill"
+    CACHE_DIMENSIONES: str = (
+        r"C:\Users\jsaldano\Documents\Procesar\Pipeline\Archivos\cache_dimensiones.pkl"
+    )
+    CHANGEFEED: str = r"C:\Users\jsaldano\Documents\Procesar\Pipeline\Archivos\changefeed"
+    # Bytes del fingerprint de reservas: 32 (sha256 completo) o 16 (truncado).
+    # Tiene que coincidir con el ancho de reservas.hash (ver Pipeline/migracion_hash.py)
+    HASH_BYTES: int = int(os.environ.get("PREVISION_HASH_BYTES", "32"))
+    if HASH_BYTES not in (16, 32):
+        raise ValueError(f"PREVISION_HASH_BYTES tiene que ser 16 o 32, no {HASH_BYTES}")
+    # Se puede apuntar a un servidor local (benchmarks/traffic_stub.py) para pruebas
+    TRAFFIC_URL: str = os.environ.get(
+        "TRAFFIC_URL", "https://traffic.welcomelatinamerica.com"
+    )
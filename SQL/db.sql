@@ -35,7 +35,10 @@ CREATE TABLE reservas (
     id_proveedor int,
     id_pasajero int,
     codigo_iata VARCHAR(3) NOT NULL,
-    hash CHAR(64) NOT NULL UNIQUE NOT NULL,
+    -- sha256 crudo de la clave lógica. Con Paths.HASH_BYTES = 16 correr
+    -- python -m Pipeline.migracion_hash --bytes 16 después de crear las tablas:
+    -- el ETL no arranca si el ancho no coincide (check_width)
+    hash BINARY(32) NOT NULL UNIQUE,
     FOREIGN KEY (id_proveedor) REFERENCES proveedores(id_proveedor),
     FOREIGN KEY (id_pasajero) REFERENCES pasajeros(id_pasajero),
     FOREIGN KEY (codigo_iata) REFERENCES iatas(codigo_iata)
@@ -73,7 +76,15 @@ INSERT INTO cuentas (banco) VALUES
 ('NC'),
 ('NACION ARS');
 
-CREATE VIEW gabi_prevision AS
+CREATE TABLE etl_runs (
+    id_run INT AUTO_INCREMENT PRIMARY KEY,
+    proceso VARCHAR(20) NOT NULL,
+    fecha DATETIME NOT NULL,
+    reservas_tocadas INT NOT NULL
+);
+
+-- Join completo, sin filtro de fecha: es la fuente del materializado
+CREATE VIEW gabi_prevision_base AS
 SELECT
     r.id_reserva,
     r.file,
@@ -107,6 +118,159 @@ LEFT JOIN proveedores p ON p.id_proveedor = r.id_proveedor
 LEFT JOIN pasajeros pa ON pa.id_pasajero = r.id_pasajero
 LEFT JOIN iatas i ON i.codigo_iata = r.codigo_iata
 LEFT JOIN saldos s ON s.id_reserva = r.id_reserva
-LEFT JOIN cuentas c ON c.id_cuenta = s.id_cuenta
-WHERE r.fecha_pago_proveedor >= CURDATE();
+LEFT JOIN cuentas c ON c.id_cuenta = s.id_cuenta;
+
+-- La vista original, calculada en cada lectura (se usa para validar el materializado)
+CREATE VIEW gabi_prevision_live AS
+SELECT * FROM gabi_prevision_base
+WHERE fecha_pago_proveedor >= CURDATE();
+
+-- Materializado de gabi_prevision_base; el ETL lo refresca por id_reserva en cada commit
+CREATE TABLE gabi_prevision_mat (
+    id_fila INT AUTO_INCREMENT PRIMARY KEY,
+    id_reserva INT NOT NULL,
+    file CHAR(6) NOT NULL,
+    estado VARCHAR(2) NOT NULL,
+    moneda ENUM('P', 'D', 'L', 'B'),
+    total DECIMAL(15, 2) NOT NULL,
+    fecha_pago_proveedor DATE,
+    fecha_in DATE,
+    fecha_out DATE,
+    nombre_proveedor VARCHAR(255),
+    nombre_pasajero VARCHAR(255),
+    pais VARCHAR(50),
+    origen VARCHAR(8) NOT NULL,
+    codigo_transferencia VARCHAR(30),
+    tipo_movimiento ENUM('I', 'E'),
+    fecha_pago DATE,
+    descripcion VARCHAR(150),
+    moneda_pago ENUM('P', 'D', 'L', 'B'),
+    monto DECIMAL(15, 2),
+    tipo_de_cambio DECIMAL(15, 2),
+    comision DECIMAL(15, 2),
+    impuesto DECIMAL(15, 2),
+    estado_pago ENUM('CANCELADO', 'PAGADO', 'PENDIENTE', 'UTILIZADO'),
+    tipo_de_saldo VARCHAR(30),
+    banco VARCHAR(50),
+    id_run INT,
+    INDEX idx_mat_reserva (id_reserva),
+    INDEX idx_mat_fecha (fecha_pago_proveedor),
+    INDEX idx_mat_run (id_run)
+);
+
+CREATE VIEW gabi_prevision AS
+SELECT
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, nombre_proveedor, nombre_pasajero, pais, origen,
+    codigo_transferencia, tipo_movimiento, fecha_pago, descripcion, moneda_pago,
+    monto, tipo_de_cambio, comision, impuesto, estado_pago, tipo_de_saldo, banco
+FROM gabi_prevision_mat
+WHERE fecha_pago_proveedor >= CURDATE();
+
+-- Retención: las reservas con fecha_pago_proveedor anterior al corte se mueven,
+-- con sus saldos, a las tablas *_hist (Pipeline/retencion.py). Conservan el id
+-- original, así los saldos archivados siguen apuntando a su reserva.
+CREATE INDEX idx_reservas_fecha_pago ON reservas (fecha_pago_proveedor);
 
+CREATE TABLE reservas_hist (
+    id_reserva INT PRIMARY KEY,
+    file CHAR(6) NOT NULL,
+    estado VARCHAR(2) NOT NULL,
+    moneda ENUM('P', 'D', 'L', 'B'),
+    total DECIMAL(15, 2) NOT NULL,
+    fecha_pago_proveedor DATE,
+    fecha_in DATE,
+    fecha_out DATE,
+    fecha_sal DATE,
+    id_proveedor int,
+    id_pasajero int,
+    codigo_iata VARCHAR(3) NOT NULL,
+    -- Único: el ETL busca acá antes de insertar, así un backfill sobre un rango
+    -- archivado no vuelve a cargar la reserva
+    hash BINARY(32) NOT NULL UNIQUE,
+    INDEX idx_hist_fecha_pago (fecha_pago_proveedor),
+    FOREIGN KEY (id_proveedor) REFERENCES proveedores(id_proveedor),
+    FOREIGN KEY (id_pasajero) REFERENCES pasajeros(id_pasajero),
+    FOREIGN KEY (codigo_iata) REFERENCES iatas(codigo_iata)
+);
+
+CREATE TABLE saldos_hist (
+    id_saldo INT PRIMARY KEY,
+    codigo_transferencia VARCHAR(30),
+    tipo_movimiento ENUM('I', 'E') NOT NULL,
+    fecha_pago DATE,
+    descripcion VARCHAR(150),
+    moneda_pago ENUM('P', 'D', 'L', 'B') NOT NULL,
+    monto DECIMAL(15, 2) NOT NULL,
+    tipo_de_cambio DECIMAL(15, 2) NOT NULL,
+    comision DECIMAL(15, 2),
+    impuesto DECIMAL(15, 2),
+    estado_pago ENUM('CANCELADO', 'PAGADO', 'PENDIENTE', 'UTILIZADO'),
+    tipo_de_saldo VARCHAR(30),
+    id_reserva int,
+    id_cuenta int,
+    FOREIGN KEY (id_reserva) REFERENCES reservas_hist(id_reserva),
+    FOREIGN KEY (id_cuenta) REFERENCES cuentas(id_cuenta)
+);
+
+-- Vigentes + archivadas, para reportes históricos
+CREATE VIEW reservas_todas AS
+SELECT
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, fecha_sal, id_proveedor, id_pasajero, codigo_iata, hash
+FROM reservas
+UNION ALL
+SELECT
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, fecha_sal, id_proveedor, id_pasajero, codigo_iata, hash
+FROM reservas_hist;
+
+CREATE VIEW saldos_todos AS
+SELECT
+    id_saldo, codigo_transferencia, tipo_movimiento, fecha_pago, descripcion,
+    moneda_pago, monto, tipo_de_cambio, comision, impuesto, estado_pago,
+    tipo_de_saldo, id_reserva, id_cuenta
+FROM saldos
+UNION ALL
+SELECT
+    id_saldo, codigo_transferencia, tipo_movimiento, fecha_pago, descripcion,
+    moneda_pago, monto, tipo_de_cambio, comision, impuesto, estado_pago,
+    tipo_de_saldo, id_reserva, id_cuenta
+FROM saldos_hist;
+
+-- El mismo join que gabi_prevision_base, sobre toda la historia
+CREATE VIEW gabi_prevision_historica AS
+SELECT
+    r.id_reserva,
+    r.file,
+    r.estado,
+    r.moneda,
+    r.total,
+    r.fecha_pago_proveedor,
+    r.fecha_in,
+    r.fecha_out,
+    p.nombre_proveedor,
+    pa.nombre_pasajero,
+    i.pais,
+    CASE
+        WHEN i.pais = 'ARGENTINA' THEN 'NACIONAL'
+        ELSE 'EXTERIOR'
+    END AS origen,
+    s.codigo_transferencia,
+    s.tipo_movimiento,
+    s.fecha_pago,
+    s.descripcion,
+    s.moneda_pago,
+    s.monto,
+    s.tipo_de_cambio,
+    s.comision,
+    s.impuesto,
+    s.estado_pago,
+    s.tipo_de_saldo,
+    c.banco
+FROM reservas_todas r
+LEFT JOIN proveedores p ON p.id_proveedor = r.id_proveedor
+LEFT JOIN pasajeros pa ON pa.id_pasajero = r.id_pasajero
+LEFT JOIN iatas i ON i.codigo_iata = r.codigo_iata
+LEFT JOIN saldos_todos s ON s.id_reserva = r.id_reserva
+LEFT JOIN cuentas c ON c.id_cuenta = s.id_cuenta;
@@ -0,0 +1,108 @@
+-- Migración de una base existente al materializado de gabi_prevision.
+-- Para instalaciones nuevas alcanza con db.sql.
+USE PREVISION;
+
+CREATE TABLE etl_runs (
+    id_run INT AUTO_INCREMENT PRIMARY KEY,
+    proceso VARCHAR(20) NOT NULL,
+    fecha DATETIME NOT NULL,
+    reservas_tocadas INT NOT NULL
+);
+
+-- Join completo, sin filtro de fecha: es la fuente del materializado
+CREATE OR REPLACE VIEW gabi_prevision_base AS
+SELECT
+    r.id_reserva,
+    r.file,
+    r.estado,
+    r.moneda,
+    r.total,
+    r.fecha_pago_proveedor,
+    r.fecha_in,
+    r.fecha_out,
+    p.nombre_proveedor,
+    pa.nombre_pasajero,
+    i.pais,
+    CASE
+        WHEN i.pais = 'ARGENTINA' THEN 'NACIONAL'
+        ELSE 'EXTERIOR'
+    END AS origen,
+    s.codigo_transferencia,
+    s.tipo_movimiento,
+    s.fecha_pago,
+    s.descripcion,
+    s.moneda_pago,
+    s.monto,
+    s.tipo_de_cambio,
+    s.comision,
+    s.impuesto,
+    s.estado_pago,
+    s.tipo_de_saldo,
+    c.banco
+FROM reservas r
+LEFT JOIN proveedores p ON p.id_proveedor = r.id_proveedor
+LEFT JOIN pasajeros pa ON pa.id_pasajero = r.id_pasajero
+LEFT JOIN iatas i ON i.codigo_iata = r.codigo_iata
+LEFT JOIN saldos s ON s.id_reserva = r.id_reserva
+LEFT JOIN cuentas c ON c.id_cuenta = s.id_cuenta;
+
+-- La vista original, calculada en cada lectura (se usa para validar el materializado)
+CREATE OR REPLACE VIEW gabi_prevision_live AS
+SELECT * FROM gabi_prevision_base
+WHERE fecha_pago_proveedor >= CURDATE();
+
+-- Materializado de gabi_prevision_base; el ETL lo refresca por id_reserva en cada commit
+CREATE TABLE gabi_prevision_mat (
+    id_fila INT AUTO_INCREMENT PRIMARY KEY,
+    id_reserva INT NOT NULL,
+    file CHAR(6) NOT NULL,
+    estado VARCHAR(2) NOT NULL,
+    moneda ENUM('P', 'D', 'L', 'B'),
+    total DECIMAL(15, 2) NOT NULL,
+    fecha_pago_proveedor DATE,
+    fecha_in DATE,
+    fecha_out DATE,
+    nombre_proveedor VARCHAR(255),
+    nombre_pasajero VARCHAR(255),
+    pais VARCHAR(50),
+    origen VARCHAR(8) NOT NULL,
+    codigo_transferencia VARCHAR(30),
+    tipo_movimiento ENUM('I', 'E'),
+    fecha_pago DATE,
+    descripcion VARCHAR(150),
+    moneda_pago ENUM('P', 'D', 'L', 'B'),
+    monto DECIMAL(15, 2),
+    tipo_de_cambio DECIMAL(15, 2),
+    comision DECIMAL(15, 2),
+    impuesto DECIMAL(15, 2),
+    estado_pago ENUM('CANCELADO', 'PAGADO', 'PENDIENTE', 'UTILIZADO'),
+    tipo_de_saldo VARCHAR(30),
+    banco VARCHAR(50),
+    id_run INT,
+    INDEX idx_mat_reserva (id_reserva),
+    INDEX idx_mat_fecha (fecha_pago_proveedor),
+    INDEX idx_mat_run (id_run)
+);
+
+CREATE OR REPLACE VIEW gabi_prevision AS
+SELECT
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, nombre_proveedor, nombre_pasajero, pais, origen,
+    codigo_transferencia, tipo_movimiento, fecha_pago, descripcion, moneda_pago,
+    monto, tipo_de_cambio, comision, impuesto, estado_pago, tipo_de_saldo, banco
+FROM gabi_prevision_mat
+WHERE fecha_pago_proveedor >= CURDATE();
+
+-- Carga inicial (después la mantiene el ETL)
+INSERT INTO gabi_prevision_mat (
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, nombre_proveedor, nombre_pasajero, pais, origen,
+    codigo_transferencia, tipo_movimiento, fecha_pago, descripcion, moneda_pago,
+    monto, tipo_de_cambio, comision, impuesto, estado_pago, tipo_de_saldo, banco
+)
+SELECT
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, nombre_proveedor, nombre_pasajero, pais, origen,
+    codigo_transferencia, tipo_movimiento, fecha_pago, descripcion, moneda_pago,
+    monto, tipo_de_cambio, comision, impuesto, estado_pago, tipo_de_saldo, banco
+FROM gabi_prevision_base;
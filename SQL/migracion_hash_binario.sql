@@ -0,0 +1,19 @@
+-- Migración de reservas.hash de CHAR(64) hex a BINARY(32) (sha256 crudo).
+-- Para instalaciones nuevas alcanza con db.sql. Para el digest truncado a 16
+-- bytes, o para migrar en lotes y medir los índices, usar
+-- python -m Pipeline.migracion_hash --bytes 16
+USE PREVISION;
+
+ALTER TABLE reservas ADD COLUMN hash_bin BINARY(32) NULL AFTER hash;
+UPDATE reservas SET hash_bin = UNHEX(hash);
+ALTER TABLE reservas
+    DROP COLUMN hash,
+    CHANGE COLUMN hash_bin hash BINARY(32) NOT NULL;
+ALTER TABLE reservas ADD UNIQUE INDEX hash (hash);
+
+ALTER TABLE reservas_hist ADD COLUMN hash_bin BINARY(32) NULL AFTER hash;
+UPDATE reservas_hist SET hash_bin = UNHEX(hash);
+ALTER TABLE reservas_hist
+    DROP COLUMN hash,
+    CHANGE COLUMN hash_bin hash BINARY(32) NOT NULL;
+ALTER TABLE reservas_hist ADD UNIQUE INDEX hash (hash);
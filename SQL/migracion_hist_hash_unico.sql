@@ -0,0 +1,13 @@
+-- Índice único sobre reservas_hist.hash para bases que ya tienen las tablas de
+-- retención. Para instalaciones nuevas alcanza con db.sql.
+USE PREVISION;
+
+-- Reservas archivadas que un backfill volvió a cargar y se archivaron de nuevo.
+-- Si esta consulta devuelve filas hay que resolverlas (dejar una por hash, con
+-- sus saldos) antes de crear el índice.
+SELECT HEX(hash) AS hash, COUNT(*) AS copias, GROUP_CONCAT(id_reserva) AS ids
+FROM reservas_hist
+GROUP BY hash
+HAVING copias > 1;
+
+ALTER TABLE reservas_hist ADD UNIQUE INDEX hash (hash);
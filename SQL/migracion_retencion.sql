@@ -0,0 +1,109 @@
+-- Migración de una base existente a las tablas de retención.
+-- Para instalaciones nuevas alcanza con db.sql.
+USE PREVISION;
+
+-- Retención: las reservas con fecha_pago_proveedor anterior al corte se mueven,
+-- con sus saldos, a las tablas *_hist (Pipeline/retencion.py). Conservan el id
+-- original, así los saldos archivados siguen apuntando a su reserva.
+CREATE INDEX idx_reservas_fecha_pago ON reservas (fecha_pago_proveedor);
+
+CREATE TABLE reservas_hist (
+    id_reserva INT PRIMARY KEY,
+    file CHAR(6) NOT NULL,
+    estado VARCHAR(2) NOT NULL,
+    moneda ENUM('P', 'D', 'L', 'B'),
+    total DECIMAL(15, 2) NOT NULL,
+    fecha_pago_proveedor DATE,
+    fecha_in DATE,
+    fecha_out DATE,
+    fecha_sal DATE,
+    id_proveedor int,
+    id_pasajero int,
+    codigo_iata VARCHAR(3) NOT NULL,
+    hash CHAR(64) NOT NULL UNIQUE,
+    INDEX idx_hist_fecha_pago (fecha_pago_proveedor),
+    FOREIGN KEY (id_proveedor) REFERENCES proveedores(id_proveedor),
+    FOREIGN KEY (id_pasajero) REFERENCES pasajeros(id_pasajero),
+    FOREIGN KEY (codigo_iata) REFERENCES iatas(codigo_iata)
+);
+
+CREATE TABLE saldos_hist (
+    id_saldo INT PRIMARY KEY,
+    codigo_transferencia VARCHAR(30),
+    tipo_movimiento ENUM('I', 'E') NOT NULL,
+    fecha_pago DATE,
+    descripcion VARCHAR(150),
+    moneda_pago ENUM('P', 'D', 'L', 'B') NOT NULL,
+    monto DECIMAL(15, 2) NOT NULL,
+    tipo_de_cambio DECIMAL(15, 2) NOT NULL,
+    comision DECIMAL(15, 2),
+    impuesto DECIMAL(15, 2),
+    estado_pago ENUM('CANCELADO', 'PAGADO', 'PENDIENTE', 'UTILIZADO'),
+    tipo_de_saldo VARCHAR(30),
+    id_reserva int,
+    id_cuenta int,
+    FOREIGN KEY (id_reserva) REFERENCES reservas_hist(id_reserva),
+    FOREIGN KEY (id_cuenta) REFERENCES cuentas(id_cuenta)
+);
+
+-- Vigentes + archivadas, para reportes históricos
+CREATE OR REPLACE VIEW reservas_todas AS
+SELECT
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, fecha_sal, id_proveedor, id_pasajero, codigo_iata, hash
+FROM reservas
+UNION ALL
+SELECT
+    id_reserva, file, estado, moneda, total, fecha_pago_proveedor, fecha_in,
+    fecha_out, fecha_sal, id_proveedor, id_pasajero, codigo_iata, hash
+FROM reservas_hist;
+
+CREATE OR REPLACE VIEW saldos_todos AS
+SELECT
+    id_saldo, codigo_transferencia, tipo_movimiento, fecha_pago, descripcion,
+    moneda_pago, monto, tipo_de_cambio, comision, impuesto, estado_pago,
+    tipo_de_saldo, id_reserva, id_cuenta
+FROM saldos
+UNION ALL
+SELECT
+    id_saldo, codigo_transferencia, tipo_movimiento, fecha_pago, descripcion,
+    moneda_pago, monto, tipo_de_cambio, comision, impuesto, estado_pago,
+    tipo_de_saldo, id_reserva, id_cuenta
+FROM saldos_hist;
+
+-- El mismo join que gabi_prevision_base, sobre toda la historia
+CREATE OR REPLACE VIEW gabi_prevision_historica AS
+SELECT
+    r.id_reserva,
+    r.file,
+    r.estado,
+    r.moneda,
+    r.total,
+    r.fecha_pago_proveedor,
+    r.fecha_in,
+    r.fecha_out,
+    p.nombre_proveedor,
+    pa.nombre_pasajero,
+    i.pais,
+    CASE
+        WHEN i.pais = 'ARGENTINA' THEN 'NACIONAL'
+        ELSE 'EXTERIOR'
+    END AS origen,
+    s.codigo_transferencia,
+    s.tipo_movimiento,
+    s.fecha_pago,
+    s.descripcion,
+    s.moneda_pago,
+    s.monto,
+    s.tipo_de_cambio,
+    s.comision,
+    s.impuesto,
+    s.estado_pago,
+    s.tipo_de_saldo,
+    c.banco
+FROM reservas_todas r
+LEFT JOIN proveedores p ON p.id_proveedor = r.id_proveedor
+LEFT JOIN pasajeros pa ON pa.id_pasajero = r.id_pasajero
+LEFT JOIN iatas i ON i.codigo_iata = r.codigo_iata
+LEFT JOIN saldos_todos s ON s.id_reserva = r.id_reserva
+LEFT JOIN cuentas c ON c.id_cuenta = s.id_cuenta;
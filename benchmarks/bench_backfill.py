@@ -0,0 +1,73 @@
+"""Escalado del backfill con 1, 2, 4 y 8 workers contra el stand-in local.
+
+Por defecto sólo mide scrape + preprocesamiento (--cargar para incluir la
+conciliación contra la BDD de Paths.ENGINE).
+
+Uso: python -m benchmarks.bench_backfill --rows 200000 --latency 0.05
+
+Resultados (200k filas, 27 shards de 14 días, latencia 0.05 s, sin --cargar,
+1 vCPU):
+
+    workers   seg  speedup
+          1  210.6    1.00
+          2  110.1    1.91
+          4   63.2    3.33
+          8   43.9    4.80
+
+Con un solo núcleo el escalado viene de solapar la espera de red; más allá
+de 4 workers el preprocesamiento (CPU) empieza a dominar.
+"""
+
+import argparse
+import datetime
+import tempfile
+import time
+
+from Pipeline import scrape_traffic
+from Pipeline.backfill import main_backfill
+from Pipeline.utils import Paths
+from benchmarks.load_test_scraper import start_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--shard-dias", type=int, default=14)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--cargar", action="store_true")
+    args = parser.parse_args()
+
+    proc = start_stub(args.port, args.rows, args.latency, 0.0)
+    try:
+        scrape_traffic.configure(f"http://127.0.0.1:{args.port}")
+        cookies = scrape_traffic.login_http()
+        desde = datetime.date.today()
+        hasta = desde + datetime.timedelta(days=364)
+
+        base = None
+        print(f"{'workers':>8} {'seg':>8} {'speedup':>8}")
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as tmp:
+                Paths.BACKFILL = tmp
+                start = time.perf_counter()
+                progress = main_backfill(
+                    desde,
+                    hasta,
+                    workers=workers,
+                    shard_dias=args.shard_dias,
+                    resume=False,
+                    cargar=args.cargar,
+                    cookies=cookies,
+                )
+                elapsed = time.perf_counter() - start
+            assert all(v["estado"] == "ok" for v in progress.values()), progress
+            base = base or elapsed
+            print(f"{workers:>8} {elapsed:>8.2f} {base / elapsed:>8.2f}")
+    finally:
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Pico de memoria de export_prevision según la cantidad de filas exportadas.
+
+Arma una tabla gabi_prevision sintética en SQLite con las columnas de
+resumen.COLUMNAS y exporta distintos tamaños con tracemalloc activo. Si el
+export es realmente por chunks, el pico tiene que quedar plano.
+
+Uso: python -m benchmarks.bench_exportar --filas 100000 500000 1000000
+
+Resultados (SQLite, chunk de 10 000 filas, 1 vCPU; tiempos con tracemalloc
+activo, que los infla, sobre todo en xlsx):
+
+    formato     filas     seg  pico (MB)
+        csv    100000    12.1       31.5
+        csv    500000    65.5       31.6
+        csv   1000000   130.2       31.6
+    parquet    100000    11.9       31.6
+    parquet    500000    61.6       31.5
+    parquet   1000000   106.7       31.5
+       xlsx     20000    60.2       31.5
+       xlsx     60000   197.9       31.5
+
+El pico es el de un chunk: no crece con el total exportado.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, text
+
+from Pipeline.exportar import SCHEMA, export_prevision
+from Pipeline.resumen import COLUMNAS
+
+# sqlite3 devuelve DECIMAL y DATE con los mismos tipos de Python que pymysql,
+# que es lo que espera el schema de Parquet
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DECIMAL", lambda b: Decimal(b.decode()))
+TIPOS = {
+    f.name: "DECIMAL" if str(f.type).startswith("decimal") else "DATE" if str(f.type) == "date32[day]" else ""
+    for f in SCHEMA
+}
+
+
+def build(engine, filas: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    hoy = date.today()
+    with engine.begin() as conn:
+        columnas = ", ".join(f"{c} {TIPOS[c]}" for c in COLUMNAS)
+        conn.execute(text(f"CREATE TABLE gabi_prevision ({columnas})"))
+        stmt = text(
+            f"INSERT INTO gabi_prevision VALUES ({', '.join(':' + c for c in COLUMNAS)})"
+        )
+        for inicio in range(0, filas, 50_000):
+            lote = []
+            for i in range(inicio, min(inicio + 50_000, filas)):
+                pago = hoy + timedelta(days=rng.randint(0, 365))
+                lote.append(
+                    {
+                        "id_reserva": i, "file": f"{i % 10**6:06d}", "estado": "OK",
+                        "moneda": rng.choice("PD"), "total": Decimal(f"{rng.uniform(10, 5000):.2f}"),
+                        "fecha_pago_proveedor": pago, "fecha_in": pago,
+                        "fecha_out": pago + timedelta(days=7),
+                        "nombre_proveedor": f"PROVEEDOR {rng.randrange(2000)}",
+                        "nombre_pasajero": f"PASAJERO {i}", "pais": "ESPAÑA",
+                        "origen": "EXTERIOR", "codigo_transferencia": f"TR{i}",
+                        "tipo_movimiento": "E", "fecha_pago": pago, "descripcion": "PAGO",
+                        "moneda_pago": "D", "monto": Decimal("100.00"),
+                        "tipo_de_cambio": Decimal("1.00"), "comision": Decimal("0.00"),
+                        "impuesto": Decimal("0.00"), "estado_pago": "PAGADO",
+                        "tipo_de_saldo": "TRANSFERENCIA", "banco": "BANCO 1",
+                    }
+                )
+            conn.execute(stmt, lote)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[100_000, 500_000, 1_000_000])
+    parser.add_argument("--formatos", nargs="+", default=["csv", "parquet", "xlsx"])
+    parser.add_argument("--chunk", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'formato':>8} {'filas':>9} {'seg':>7} {'pico (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for filas in args.filas:
+            engine = create_engine(
+                f"sqlite:///{os.path.join(tmp, f'{filas}.db')}",
+                connect_args={"detect_types": sqlite3.PARSE_DECLTYPES},
+            )
+            build(engine, filas)
+            for formato in args.formatos:
+                destino = os.path.join(tmp, f"export_{filas}.{formato}")
+                tracemalloc.start()
+                start = time.perf_counter()
+                # Sin filtros: con vista y filtros por defecto se exporta toda la tabla
+                export_prevision(destino, formato, chunk=args.chunk, engine=engine)
+                elapsed = time.perf_counter() - start
+                pico = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+                os.remove(destino)
+                print(f"{formato:>8} {filas:>9} {elapsed:>7.1f} {pico:>10.1f}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
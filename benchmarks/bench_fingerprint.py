@@ -0,0 +1,87 @@
+"""Fingerprints hex vs binarios: memoria de un set, velocidad de lookup y de hash.
+
+Genera claves sintéticas con el mismo formato que ProcessData.hash_row y
+compara los tres formatos: hex (64 chars), sha256 crudo (32 bytes) y
+truncado (16 bytes). Con --db también reporta el tamaño de los índices de
+reservas en Paths.ENGINE (information_schema / innodb_index_stats).
+
+Uso: python -m benchmarks.bench_fingerprint --filas 1000000
+"""
+
+import argparse
+import hashlib
+import random
+import time
+import tracemalloc
+
+FORMATOS = {
+    "hex": lambda s: hashlib.sha256(s).hexdigest(),
+    "bin32": lambda s: hashlib.sha256(s).digest(),
+    "bin16": lambda s: hashlib.sha256(s).digest()[:16],
+}
+
+
+def claves(filas: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        f"{rng.randrange(10**6):06d}|D|2025-{rng.randint(1, 12):02d}-01|2025-12-31|None|"
+        f"PROVEEDOR {rng.randrange(5000)}|PASAJERO {i}|BUE".encode()
+        for i in range(filas)
+    ]
+
+
+def medir(fn, datos: list, probes: list) -> dict:
+    start = time.perf_counter()
+    for s in datos:
+        fn(s)
+    hash_s = time.perf_counter() - start
+
+    # Memoria del set con sus elementos (los digests se crean con tracemalloc activo)
+    tracemalloc.start()
+    conjunto = set(fn(s) for s in datos)
+    mb = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+
+    buscados = [fn(s) for s in probes]
+    start = time.perf_counter()
+    hits = sum(d in conjunto for d in buscados)
+    lookup_s = time.perf_counter() - start
+    return {
+        "hash_s": hash_s,
+        "set_mb": mb,
+        "lookup_ns": lookup_s / len(buscados) * 1e9,
+        "hits": hits,
+        "unicos": len(conjunto),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--db", action="store_true", help="tamaño de índices en la BDD")
+    args = parser.parse_args()
+
+    datos = claves(args.filas)
+    # Mitad presentes, mitad ausentes
+    probes = random.Random(1).sample(datos, args.filas // 2) + claves(args.filas // 2, seed=2)
+
+    print(f"{'formato':>8} {'hash (s)':>9} {'set (MB)':>9} {'lookup (ns)':>12} {'únicos':>9}")
+    for nombre, fn in FORMATOS.items():
+        r = medir(fn, datos, probes)
+        print(
+            f"{nombre:>8} {r['hash_s']:>9.2f} {r['set_mb']:>9.1f} "
+            f"{r['lookup_ns']:>12.0f} {r['unicos']:>9}"
+        )
+
+    if args.db:
+        from Pipeline.migracion_hash import column_type, index_sizes
+        from Pipeline.utils import Paths
+
+        with Paths.ENGINE.connect() as conn:
+            print(f"reservas.hash: {column_type(conn, 'reservas')}")
+            for nombre, mb in index_sizes(conn, "reservas").items():
+                print(f"  {nombre}: {mb} MB")
+
+
+if __name__ == "__main__":
+    main()
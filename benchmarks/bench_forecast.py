@@ -0,0 +1,193 @@
+"""Benchmark del motor de previsión sobre millones de reservas sintéticas.
+
+Uso: python -m benchmarks.bench_forecast --reservas 3000000 [--sqlite]
+
+Sin --sqlite el motor se arma desde el DataFrame y se mide sólo el cálculo;
+con --sqlite las filas se vuelcan a un gabi_prevision_mat en SQLite y se
+miden load() y refresh() de verdad (lectura incluida, runs en etl_runs).
+
+Resultados con 3 000 000 de reservas (1 vCPU, cambios = 1% por run):
+
+    en memoria
+      carga + agregado completo                  5.71 s
+      forecast por moneda / completo             0.045 s / 0.183 s
+      refresh incremental (30 000 reservas)      0.673 s  (5 buckets)
+      recálculo completo equivalente             6.02 s
+
+    SQLite
+      load (lectura + agregado completo)        27.96 s
+      forecast por moneda / completo             0.040 s / 0.164 s
+      refresh sin runs nuevos                    0.001 s
+      refresh tras un run (30 000 reservas)      0.688 s
+      refresh tras retención (38 755 reservas)   8.84 s
+      recálculo completo (load)                 24.72 s
+
+En ambos casos el resultado incremental coincide con el recálculo completo.
+El refresh tras retención es el único que barre los id_reserva del
+materializado, y sólo cuando entre los runs nuevos hay uno de retención.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlmodel import Session, create_engine, text
+
+from Pipeline.forecast import DIMENSIONES, RETENCION, ForecastEngine
+from Pipeline.models import EtlRun
+
+
+def synthetic_rows(n: int, seed: int = 0) -> pd.DataFrame:
+    """Filas con la forma de gabi_prevision_mat: ~40% de las reservas con un saldo"""
+    rng = np.random.default_rng(seed)
+    fechas = pd.Timestamp("2026-01-01") + pd.to_timedelta(rng.integers(0, 540, n), "D")
+    reservas = pd.DataFrame(
+        {
+            "id_reserva": np.arange(1, n + 1),
+            "moneda": rng.choice(["P", "D", "L", "B"], n, p=[0.5, 0.4, 0.05, 0.05]),
+            "total": rng.uniform(10, 5000, n).round(2),
+            "fecha_pago_proveedor": fechas.date,
+            "nombre_proveedor": pd.Categorical.from_codes(
+                rng.integers(0, 800, n), [f"PROVEEDOR {i}" for i in range(800)]
+            ),
+            "origen": rng.choice(["NACIONAL", "EXTERIOR"], n),
+            "tipo_movimiento": None,
+            "moneda_pago": None,
+            "monto": np.nan,
+            "tipo_de_cambio": np.nan,
+            "estado_pago": None,
+            "id_run": rng.integers(1, 100, n),
+        }
+    )
+    con_saldo = rng.random(n) < 0.4
+    reservas.loc[con_saldo, "monto"] = (
+        reservas.loc[con_saldo, "total"] * rng.uniform(0.1, 1.0, con_saldo.sum())
+    ).round(2)
+    # Mayormente pagos en la moneda de la reserva; ~10% de devoluciones (I)
+    reservas.loc[con_saldo, "moneda_pago"] = reservas.loc[con_saldo, "moneda"]
+    reservas.loc[con_saldo, "tipo_de_cambio"] = 1.0
+    reservas.loc[con_saldo, "tipo_movimiento"] = rng.choice(
+        ["E", "I"], con_saldo.sum(), p=[0.9, 0.1]
+    )
+    reservas.loc[con_saldo, "estado_pago"] = rng.choice(
+        ["PAGADO", "PENDIENTE", "UTILIZADO"], con_saldo.sum()
+    )
+    return reservas
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<45} {time.perf_counter() - start:>8.3f} s")
+    return result
+
+
+def cambios_de_un_run(rows: pd.DataFrame, fraccion: float, id_run: int) -> pd.DataFrame:
+    """Un run que toca una fracción de las reservas, concentradas en pocas semanas"""
+    rng = np.random.default_rng(1)
+    n = int(len(rows) * fraccion)
+    semana = rows["fecha_pago_proveedor"].min()
+    cambios = rows[rows["fecha_pago_proveedor"] < semana + pd.Timedelta(days=28)]
+    cambios = cambios.sample(min(n, len(cambios)), random_state=1).copy()
+    cambios["total"] = (cambios["total"] * rng.uniform(0.9, 1.1, len(cambios))).round(2)
+    cambios["id_run"] = id_run
+    return cambios
+
+
+def iguales(a: ForecastEngine, b: ForecastEngine) -> bool:
+    x = a.forecast().set_index(DIMENSIONES)["pendiente"].sort_index()
+    y = b.forecast().set_index(DIMENSIONES)["pendiente"].sort_index()
+    return len(x) == len(y) and np.allclose(x.values, y.reindex(x.index).values)
+
+
+def en_memoria(rows: pd.DataFrame, fraccion: float) -> None:
+    """Motor armado desde el DataFrame: mide sólo el cálculo, sin lectura"""
+    engine = timed("carga + agregado completo", lambda: ForecastEngine.from_frame(rows))
+    timed("forecast por moneda", lambda: engine.forecast(por=["bucket", "moneda"]))
+    timed("forecast completo", lambda: engine.forecast())
+
+    cambios = cambios_de_un_run(rows, fraccion, 100)
+    buckets = timed(
+        f"refresh incremental ({len(cambios)} reservas)", lambda: engine.apply(cambios)
+    )
+    print(f"  buckets recalculados: {buckets}")
+
+    todas = pd.concat([rows[~rows["id_reserva"].isin(cambios["id_reserva"])], cambios])
+    full = timed("recálculo completo equivalente", lambda: ForecastEngine.from_frame(todas))
+    print(f"incremental == completo: {iguales(engine, full)}")
+
+
+def en_sqlite(rows: pd.DataFrame, fraccion: float) -> None:
+    """load() y refresh() de verdad contra un gabi_prevision_mat en SQLite"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_engine(f"sqlite:///{os.path.join(tmp, 'forecast.db')}")
+        mat = rows.assign(fecha_pago_proveedor=rows["fecha_pago_proveedor"].astype(str))
+
+        def volcar():
+            mat.to_sql("gabi_prevision_mat", db, index=False, chunksize=100_000)
+            EtlRun.__table__.create(db)
+            with db.begin() as conn:
+                conn.execute(text("CREATE INDEX idx_mat_reserva ON gabi_prevision_mat (id_reserva)"))
+                conn.execute(text("CREATE INDEX idx_mat_run ON gabi_prevision_mat (id_run)"))
+                conn.execute(
+                    text("INSERT INTO etl_runs (id_run, proceso, fecha, reservas_tocadas) VALUES (:i, 'excel', :f, 0)"),
+                    [{"i": int(i), "f": datetime.now()} for i in sorted(rows["id_run"].unique())],
+                )
+
+        timed("volcar a SQLite", volcar)
+        engine = ForecastEngine(db)
+        timed("load (lectura + agregado completo)", engine.load)
+        timed("forecast por moneda", lambda: engine.forecast(por=["bucket", "moneda"]))
+        timed("forecast completo", lambda: engine.forecast())
+        timed("refresh sin runs nuevos", engine.refresh)
+
+        cambios = cambios_de_un_run(rows, fraccion, 100)
+        with Session(db) as session:
+            run = EtlRun(proceso="excel", fecha=datetime.now(), reservas_tocadas=len(cambios))
+            session.add(run)
+            session.flush()
+            session.exec(
+                text("UPDATE gabi_prevision_mat SET total = :t, id_run = :r WHERE id_reserva = :i"),
+                params=[
+                    {"t": t, "r": run.id_run, "i": int(i)}
+                    for i, t in zip(cambios["id_reserva"], cambios["total"])
+                ],
+            )
+            session.commit()
+        timed(f"refresh tras un run ({len(cambios)} reservas)", engine.refresh)
+
+        # La retención borra del materializado sin dejar fila nueva
+        corte = str(rows["fecha_pago_proveedor"].min() + pd.Timedelta(days=7))
+        with Session(db) as session:
+            borradas = session.exec(
+                text("DELETE FROM gabi_prevision_mat WHERE fecha_pago_proveedor < :c"),
+                params={"c": corte},
+            ).rowcount
+            session.add(EtlRun(proceso=RETENCION, fecha=datetime.now(), reservas_tocadas=borradas))
+            session.commit()
+        timed(f"refresh tras retención ({borradas} reservas)", engine.refresh)
+
+        full = ForecastEngine(db)
+        timed("recálculo completo (load)", full.load)
+        print(f"incremental == completo: {iguales(engine, full)}")
+        db.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reservas", type=int, default=3_000_000)
+    parser.add_argument("--cambios", type=float, default=0.01, help="fracción por run")
+    parser.add_argument(
+        "--sqlite", action="store_true", help="leer y refrescar desde una base SQLite"
+    )
+    args = parser.parse_args()
+
+    rows = timed("generar filas", lambda: synthetic_rows(args.reservas))
+    if args.sqlite:
+        en_sqlite(rows, args.cambios)
+    else:
+        en_memoria(rows, args.cambios)
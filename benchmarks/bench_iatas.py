@@ -0,0 +1,116 @@
+"""Tiempo de recarga del catálogo de IATAs (read_iatas + load_iatas).
+
+El iatas.xlsx real no está en el repo: se genera uno sintético con las mismas
+columnas (Codigociudad, Nombreciudad, Idpaises), algunas ciudades sin país
+que resuelve PAISES_POR_CIUDAD, y se mide la lectura del Excel y la recarga
+contra una tabla iatas ya cargada con los mismos datos (el caso de todos los
+días: nada cambió, no se escribe nada).
+
+Con --db la recarga corre contra Paths.ENGINE (MySQL) y además se mide una
+con --cambios países distintos, que ejecuta el upsert y el refresh de
+gabi_prevision_mat. Sin --db se usa SQLite, que no compila el upsert de MySQL.
+
+Uso: python -m benchmarks.bench_iatas --filas 10000 [--db --cambios 50]
+
+Resultados en SQLite (mediana de 5 recargas sin cambios, 1 vCPU; rango de
+tres corridas):
+
+     filas  read_iatas     load_iatas     total
+    10 000  0.57-0.83 s    0.03-0.04 s    0.61-0.87 s
+    17 576  1.27-1.58 s    0.10-0.15 s    1.37-1.72 s   (todos los códigos de tres letras)
+
+Casi todo el tiempo es parsear el Excel con openpyxl; el diff contra la
+tabla es una lectura de codigo_iata/pais y una comparación vectorizada.
+La recarga con países cambiados (upsert + refresh) no está medida: necesita
+MySQL (--db).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+import pandas as pd
+from sqlmodel import Session, SQLModel, create_engine
+
+from Pipeline.models import Iata
+from Pipeline.referencias import PAISES_POR_CIUDAD, load_iatas, read_iatas
+from Pipeline.utils import Paths
+
+PAISES = ["ARGENTINA", "BRASIL", "ESPAÑA", "ITALIA", "FRANCIA", "ESTADOS UNIDOS", "MEXICO"]
+
+
+def synthetic_file(path: str, filas: int, seed: int = 0) -> None:
+    if filas > 26**3:
+        raise ValueError(f"Hay {26**3} códigos de tres letras, no alcanzan para {filas} filas")
+    rng = random.Random(seed)
+    codigos = set()
+    while len(codigos) < filas:
+        codigos.add("".join(rng.choices(string.ascii_uppercase, k=3)))
+    sin_pais = list(PAISES_POR_CIUDAD)
+    rows = []
+    for i, codigo in enumerate(sorted(codigos)):
+        if i % 200 == 0:
+            rows.append((codigo, rng.choice(sin_pais), None))
+        else:
+            rows.append((codigo, f"CIUDAD {i}", rng.choice(PAISES)))
+    pd.DataFrame(rows, columns=["Codigociudad", "Nombreciudad", "Idpaises"]).to_excel(
+        path, index=False
+    )
+
+
+def recargar(engine, path: str) -> tuple[float, float, dict]:
+    start = time.perf_counter()
+    data = read_iatas(path)
+    leido = time.perf_counter()
+    with Session(engine) as session:
+        counts = load_iatas(session, data)
+        session.commit()
+    return leido - start, time.perf_counter() - leido, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="recargar contra Paths.ENGINE")
+    parser.add_argument("--cambios", type=int, default=50, help="países cambiados (con --db)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "iatas.xlsx")
+        synthetic_file(path, args.filas)
+
+        if args.db:
+            engine = Paths.ENGINE
+            recargar(engine, path)  # deja la tabla con los datos del archivo
+        else:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'iatas.db')}")
+            SQLModel.metadata.create_all(engine, tables=[Iata.__table__])
+            with Session(engine) as session:
+                session.add_all(Iata(**r) for r in read_iatas(path).to_dict("records"))
+                session.commit()
+
+        tiempos = [recargar(engine, path) for _ in range(args.repeticiones)]
+        lectura = statistics.median(t[0] for t in tiempos)
+        carga = statistics.median(t[1] for t in tiempos)
+        print(f"{args.filas} filas, {tiempos[-1][2]}")
+        print(f"  read_iatas {lectura:.3f} s | load_iatas {carga:.3f} s | total {lectura + carga:.3f} s")
+
+        if args.db:
+            data = pd.read_excel(path)
+            cambiar = data["Idpaises"].notna()
+            idx = data[cambiar].sample(args.cambios, random_state=1).index
+            data.loc[idx, "Idpaises"] = "URUGUAY"
+            data.to_excel(path, index=False)
+            lectura, carga, counts = recargar(engine, path)
+            print(f"  con {args.cambios} cambios: {counts}")
+            print(f"  read_iatas {lectura:.3f} s | load_iatas {carga:.3f} s | total {lectura + carga:.3f} s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
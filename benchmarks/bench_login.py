@@ -0,0 +1,90 @@
+"""Login HTTP vs Selenium: tiempo y memoria contra el stand-in local de traffic.
+
+La memoria es el pico de RSS del proceso más todos sus hijos (chromedriver y
+los procesos de Chrome en el caso de Selenium), muestreado cada 20 ms, menos
+el RSS previo al login.
+
+Uso: python -m benchmarks.bench_login --repeticiones 5 [--selenium]
+
+Resultados (10 repeticiones, stand-in local, 1 vCPU):
+
+        login  seg (med)  seg (max)  MB (max)
+         http      0.047      0.051       0.2
+
+Selenium queda pendiente de medir en una máquina con Chrome: en este entorno
+Selenium Manager no encuentra ni puede descargar el navegador.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import psutil
+
+from Pipeline import scrape_traffic
+from benchmarks.load_test_scraper import start_stub
+
+
+def rss_total(proc: psutil.Process) -> int:
+    total = proc.memory_info().rss
+    for child in proc.children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def measure(fn) -> tuple[float, float]:
+    """Segundos y pico de MB por encima del RSS inicial mientras corre `fn`"""
+    proc = psutil.Process()
+    base = rss_total(proc)
+    peak = base
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(0.02):
+            peak = max(peak, rss_total(proc))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        fn()
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        sampler.join()
+    return elapsed, (peak - base) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--selenium", action="store_true", help="medir también Chrome")
+    args = parser.parse_args()
+
+    proc = start_stub(args.port, 1_000, 0.0, 0.0)
+    try:
+        scrape_traffic.configure(f"http://127.0.0.1:{args.port}")
+        metodos = {"http": scrape_traffic.login_http}
+        if args.selenium:
+            metodos["selenium"] = scrape_traffic.login_selenium
+
+        print(f"{'login':>9} {'seg (med)':>10} {'seg (max)':>10} {'MB (max)':>9}")
+        for nombre, fn in metodos.items():
+            runs = [measure(fn) for _ in range(args.repeticiones)]
+            segs = [r[0] for r in runs]
+            print(
+                f"{nombre:>9} {statistics.median(segs):>10.3f} {max(segs):>10.3f} "
+                f"{max(r[1] for r in runs):>9.1f}"
+            )
+    finally:
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
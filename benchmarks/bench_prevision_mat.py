@@ -0,0 +1,142 @@
+"""Latencia de lectura de gabi_prevision: materializado vs join en vivo.
+
+Contra la BDD de Paths.ENGINE alcanza con `python -m Pipeline.resumen bench`.
+Este script arma una base SQLite sintética con el mismo join (la definición
+de gabi_prevision_base se toma de SQL/db.sql), reconstruye el materializado
+con rebuild_prevision y mide ambas lecturas con read_latency. Sirve para
+comparar órdenes de magnitud sin un MySQL a mano; los tiempos absolutos no
+son los de producción.
+
+Uso: python -m benchmarks.bench_prevision_mat --reservas 200000
+
+Resultados en SQLite (mediana de 10 lecturas completas, 1 vCPU):
+
+    reservas  filas vigentes  materializado  en vivo
+     200 000          22 139       244.6 ms  418.6 ms
+   1 000 000         110 512      1276.3 ms  2123.8 ms
+
+Buena parte de cada lectura es armar las filas en Python (fetchall); la
+diferencia entre ambas es el costo del join de cinco tablas que el
+materializado ya no paga.
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+from datetime import date, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, text
+
+from Pipeline import models  # noqa: F401 - registra las tablas en la metadata
+from Pipeline.resumen import read_latency, rebuild_prevision
+
+DB_SQL = os.path.join(os.path.dirname(__file__), "..", "SQL", "db.sql")
+
+
+def base_view_sql() -> str:
+    with open(DB_SQL, encoding="utf-8") as f:
+        sql = f.read()
+    return re.search(r"CREATE VIEW gabi_prevision_base AS.*?;", sql, re.S).group(0)
+
+
+def build(engine, reservas: int, seed: int = 0) -> None:
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(seed)
+    hoy = date.today()
+    with engine.begin() as conn:
+        conn.execute(text(base_view_sql()))
+        conn.execute(
+            text(
+                "CREATE VIEW gabi_prevision_live AS SELECT * FROM gabi_prevision_base "
+                "WHERE fecha_pago_proveedor >= date('now')"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE gabi_prevision_mat AS "
+                "SELECT *, 0 AS id_run FROM gabi_prevision_base WHERE 0"
+            )
+        )
+        conn.execute(text("CREATE INDEX idx_mat_reserva ON gabi_prevision_mat (id_reserva)"))
+        conn.execute(text("CREATE INDEX idx_mat_fecha ON gabi_prevision_mat (fecha_pago_proveedor)"))
+        conn.execute(
+            text(
+                "CREATE VIEW gabi_prevision AS SELECT * FROM gabi_prevision_mat "
+                "WHERE fecha_pago_proveedor >= date('now')"
+            )
+        )
+
+        conn.execute(
+            text("INSERT INTO proveedores (id_proveedor, nombre_proveedor) VALUES (:i, :n)"),
+            [{"i": i, "n": f"PROVEEDOR {i}"} for i in range(1, 2001)],
+        )
+        conn.execute(
+            text("INSERT INTO pasajeros (id_pasajero, nombre_pasajero) VALUES (:i, :n)"),
+            [{"i": i, "n": f"PASAJERO {i}"} for i in range(1, reservas + 1)],
+        )
+        conn.execute(
+            text("INSERT INTO iatas (codigo_iata, pais) VALUES (:c, :p)"),
+            [{"c": c, "p": p} for c, p in [("BUE", "ARGENTINA"), ("MAD", "ESPAÑA"), ("ROM", "ITALIA")]],
+        )
+        conn.execute(
+            text("INSERT INTO cuentas (id_cuenta, banco) VALUES (:i, :b)"),
+            [{"i": i, "b": f"BANCO {i}"} for i in range(1, 11)],
+        )
+        filas, saldos = [], []
+        for i in range(1, reservas + 1):
+            # Dos años de historia y tres meses hacia adelante
+            pago = hoy + timedelta(days=rng.randint(-730, 90))
+            filas.append(
+                {
+                    "i": i, "f": f"{i:06d}", "m": rng.choice("PD"), "t": rng.uniform(10, 5000),
+                    "fp": pago, "fi": pago, "fo": pago + timedelta(days=7),
+                    "pr": rng.randint(1, 2000), "pa": i, "c": rng.choice(["BUE", "MAD", "ROM"]),
+                    "h": i.to_bytes(32, "big"),
+                }
+            )
+            if rng.random() < 0.6:
+                saldos.append(
+                    {"r": i, "m": rng.uniform(10, 5000), "c": rng.randint(1, 10), "fp": pago}
+                )
+        conn.execute(
+            text(
+                "INSERT INTO reservas (id_reserva, file, estado, moneda, total, fecha_pago_proveedor, "
+                "fecha_in, fecha_out, id_proveedor, id_pasajero, codigo_iata, hash) "
+                "VALUES (:i, :f, 'OK', :m, :t, :fp, :fi, :fo, :pr, :pa, :c, :h)"
+            ),
+            filas,
+        )
+        conn.execute(
+            text(
+                "INSERT INTO saldos (tipo_movimiento, fecha_pago, moneda_pago, monto, "
+                "tipo_de_cambio, estado_pago, id_reserva, id_cuenta) "
+                "VALUES ('E', :fp, 'D', :m, 1, 'PAGADO', :r, :c)"
+            ),
+            saldos,
+        )
+    with Session(engine) as session:
+        rebuild_prevision(session)
+        session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reservas", type=int, default=200_000)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'prevision.db')}")
+        build(engine, args.reservas)
+        with engine.connect() as conn:
+            filas = conn.execute(text("SELECT COUNT(*) FROM gabi_prevision")).scalar()
+        print(f"{args.reservas} reservas, {filas} filas vigentes en gabi_prevision")
+        for vista, segundos in read_latency(engine, args.repeticiones).items():
+            print(f"{vista:>20}: {segundos * 1000:8.1f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
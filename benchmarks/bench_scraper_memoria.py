@@ -0,0 +1,89 @@
+"""Compara la acumulación de páginas de main_scraper: lista de dicts vs columnas.
+
+Uso: python -m benchmarks.bench_scraper_memoria
+
+Resultado de referencia (1 vCPU, 5 GB, Python 3.11, pandas 3.0, orjson):
+
+     filas     método      seg    pico MB
+    100000      dicts     6.45      229.7
+    100000   columnas     4.69       75.0
+   1000000      dicts    60.84     2295.8
+   1000000   columnas    44.31      754.6
+"""
+
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from Pipeline.scrape_traffic import COLS, COLUMNS, ColumnBuffer, loads
+
+TAKE = 100
+EXTRA = [f"campo_{i}" for i in range(14)]  # el reporte trae más campos de los que se usan
+
+
+def make_pages(n_distintas: int = 50) -> list[bytes]:
+    """Páginas JSON sintéticas con la forma de SaldoAutoriza_List/List"""
+    rnd = random.Random(0)
+    pages = []
+    for p in range(n_distintas):
+        entities = []
+        for i in range(TAKE):
+            e = {
+                "rva": f"{rnd.randint(0, 999999):06d}",
+                "estadoope": rnd.choice(["OK", "CA", "PE"]),
+                "monedalocal": rnd.choice(["P", "D"]),
+                "Fec_in": "2026-11-02T00:00:00",
+                "Fec_out": "2026-11-09T00:00:00",
+                "Descrip": f"PASAJERO {rnd.randint(0, 50000)}",
+                "saldo": round(rnd.uniform(10, 5000), 2),
+                "nombre": f"PROVEEDOR {rnd.randint(0, 800)}",
+                "ciudad": rnd.choice(["BUE", "MAD", "ROM", "PAR"]),
+                "fec_sal": "2026-11-01T00:00:00",
+                "fec_vencop": "2026-10-30T00:00:00",
+            }
+            e.update({k: f"valor {p}-{i}" for k in EXTRA})
+            entities.append(e)
+        pages.append(json.dumps({"Entities": entities, "TotalCount": 0}).encode())
+    return pages
+
+
+def legacy(pages: list[bytes], n_pages: int) -> pd.DataFrame:
+    all_data = []
+    for i in range(n_pages):
+        all_data.extend(json.loads(pages[i % len(pages)]).get("Entities", []))
+    data = pd.DataFrame(all_data, columns=COLS)
+    data.rename(columns=COLUMNS, inplace=True)
+    return data
+
+
+def columnar(pages: list[bytes], n_pages: int) -> pd.DataFrame:
+    buffer = ColumnBuffer()
+    for i in range(n_pages):
+        buffer.append(loads(pages[i % len(pages)]).get("Entities", []))
+    return buffer.to_frame()
+
+
+def measure(fn, pages, n_pages) -> tuple[float, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = fn(pages, n_pages)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del df
+    return elapsed, peak / 2**20
+
+
+if __name__ == "__main__":
+    pages = make_pages()
+    print(f"decoder: {loads.__module__}")
+    print(f"{'filas':>10} {'método':>10} {'seg':>8} {'pico MB':>10}")
+    for rows in (100_000, 1_000_000):
+        for name, fn in (("dicts", legacy), ("columnas", columnar)):
+            elapsed, peak = measure(fn, pages, rows // TAKE)
+            print(f"{rows:>10} {name:>10} {elapsed:>8.2f} {peak:>10.1f}")
@@ -0,0 +1,112 @@
+"""Prueba de carga del scraper contra el stand-in local de traffic.
+
+Levanta benchmarks.traffic_stub en otro proceso (para no competir por el GIL
+con el cliente), apunta el scraper a ese servidor y mide páginas/seg y tiempo
+total de extracción para cada combinación de concurrencia y tamaño de página.
+
+Uso: python -m benchmarks.load_test_scraper --rows 200000 --latency 0.05
+
+Resultado de referencia (1 vCPU, --rows 100000 --latency 0.05; la ventana de
+tres meses abarca 25468 filas del dataset de un año):
+
+ conc   take    filas  páginas      seg    pág/s
+    1    100    25468      255    24.91     10.2
+    2    100    25468      255    12.35     20.7
+    4    100    25468      255     6.35     40.2
+    8    100    25468      255     3.34     76.3
+    1    500    25468       51     3.13     16.3
+    2    500    25468       51     1.74     29.2
+    4    500    25468       51     0.96     53.3
+    8    500    25468       51     0.71     71.5
+    1   1000    25468       26     1.84     14.2
+    2   1000    25468       26     1.13     22.9
+    4   1000    25468       26     0.68     38.4
+    8   1000    25468       26     0.53     48.8
+"""
+
+import argparse
+import datetime
+import subprocess
+import sys
+import time
+
+import requests
+from dateutil.relativedelta import relativedelta
+
+from Pipeline import scrape_traffic
+
+
+def start_stub(port: int, rows: int, latency: float, error_rate: float):
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.traffic_stub",
+            "--port",
+            str(port),
+            "--rows",
+            str(rows),
+            "--latency",
+            str(latency),
+            "--error-rate",
+            str(error_rate),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    proc.stdout.readline()  # espera el mensaje de arranque
+    return proc
+
+
+def run(concurrencia: int, take: int, cookies: dict) -> tuple[int, float]:
+    desde = datetime.date.today()
+    hasta = desde + relativedelta(months=3)
+    session = requests.Session()
+    start = time.perf_counter()
+    buffer = scrape_traffic.fetch_window(
+        session, cookies, desde, hasta, take=take, concurrencia=concurrencia
+    )
+    return buffer.rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--take", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument(
+        "--selenium", action="store_true", help="medir también el login con Chrome"
+    )
+    args = parser.parse_args()
+
+    proc = start_stub(args.port, args.rows, args.latency, args.error_rate)
+    try:
+        scrape_traffic.configure(f"http://127.0.0.1:{args.port}")
+        scrape_traffic.ESPERA_REINTENTO = 0.05
+
+        start = time.perf_counter()
+        cookies = scrape_traffic.login_http()
+        print(f"login HTTP: {time.perf_counter() - start:.3f} s")
+        if args.selenium:
+            start = time.perf_counter()
+            scrape_traffic.login_selenium()
+            print(f"login Selenium: {time.perf_counter() - start:.3f} s")
+
+        print(f"{'conc':>5} {'take':>6} {'filas':>8} {'páginas':>8} {'seg':>8} {'pág/s':>8}")
+        for take in args.take:
+            for concurrencia in args.concurrencia:
+                rows, elapsed = run(concurrencia, take, cookies)
+                pages = -(-rows // take)
+                print(
+                    f"{concurrencia:>5} {take:>6} {rows:>8} {pages:>8} "
+                    f"{elapsed:>8.2f} {pages / elapsed:>8.1f}"
+                )
+    finally:
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
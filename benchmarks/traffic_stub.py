@@ -0,0 +1,270 @@
+"""Servidor local que imita a iTraffic para probar el scraper sin conexión.
+
+Sirve el login (página, cookie anti-forgery y cookie de sesión) y el servicio
+SaldoAutoriza_List/List con el contrato Take/Skip, con latencia, tasa de error
+y tamaño del dataset configurables. Sólo usa la biblioteca estándar.
+
+Uso: python -m benchmarks.traffic_stub --port 8765 --rows 100000 --latency 0.05
+"""
+
+import argparse
+import bisect
+import datetime
+import json
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+PREFIJO = "/iTraffic_TSA"
+RUTA_LOGIN = f"{PREFIJO}/Account/Login"
+RUTA_DATA = f"{PREFIJO}/Services/Z_Reportes/SaldoAutoriza_List/List"
+COOKIE_CSRF = "CSRF-TOKEN"
+COOKIE_AUTH = ".AspNetAuth"
+
+LOGIN_HTML = """<!DOCTYPE html>
+<html><body>
+<form id="login" onsubmit="return false;">
+  <input id="Softur_Serene_Membership_LoginPanel0_Username" type="text">
+  <input id="Softur_Serene_Membership_LoginPanel0_Password" type="password">
+  <input name="__RequestVerificationToken" type="hidden" value="{token}">
+  <button id="Softur_Serene_Membership_LoginPanel0_LoginButton">Ingresar</button>
+</form>
+<script>
+document.getElementById("Softur_Serene_Membership_LoginPanel0_LoginButton").onclick = function () {{
+  fetch("{ruta}", {{
+    method: "POST",
+    headers: {{"Content-Type": "application/json", "X-CSRF-TOKEN": "{token}"}},
+    body: JSON.stringify({{
+      Username: document.getElementById("Softur_Serene_Membership_LoginPanel0_Username").value,
+      Password: document.getElementById("Softur_Serene_Membership_LoginPanel0_Password").value
+    }})
+  }}).then(function (r) {{ if (r.ok) {{ window.location = "{prefijo}/"; }} }});
+}};
+</script>
+</body></html>
+"""
+
+
+class Dataset:
+    """Filas sintéticas ordenadas por fec_vencop, el campo por el que filtra la ventana"""
+
+    def __init__(self, rows: int, seed: int = 0, dias: int = 365):
+        rnd = random.Random(seed)
+        hoy = datetime.date.today()
+        self.entities: list[dict] = []
+        for i in range(rows):
+            vencop = hoy + datetime.timedelta(days=rnd.randrange(dias))
+            fec_in = vencop + datetime.timedelta(days=rnd.randrange(1, 30))
+            self.entities.append(
+                {
+                    "rva": f"{i % 1_000_000:06d}",
+                    "estadoope": rnd.choice(["OK", "CA", "PE", "RQ"]),
+                    "monedalocal": rnd.choice(["P", "D"]),
+                    "Fec_in": f"{fec_in}T00:00:00",
+                    "Fec_out": f"{fec_in + datetime.timedelta(days=rnd.randrange(1, 15))}T00:00:00",
+                    "Descrip": f"PASAJERO {rnd.randrange(rows // 3 + 1)}",
+                    "saldo": round(rnd.uniform(10, 5000), 2),
+                    "nombre": f"PROVEEDOR {rnd.randrange(800)}",
+                    "ciudad": rnd.choice(["BUE", "MAD", "ROM", "PAR", "LON", "NYC"]),
+                    "fec_sal": f"{fec_in - datetime.timedelta(days=1)}T00:00:00",
+                    "fec_vencop": f"{vencop}T00:00:00",
+                    "cod_oper": rnd.randrange(100),
+                    "cod_vdor": rnd.randrange(20),
+                    "tiposaldo": "P",
+                    "tipocc": None,
+                }
+            )
+        self.entities.sort(key=lambda e: (e["fec_vencop"], e["rva"]))
+        self.fechas = [e["fec_vencop"][:10] for e in self.entities]
+
+    def window(self, desde: str, hasta: str) -> tuple[int, int]:
+        """Rango [inicio, fin) de filas con fec_vencop entre desde y hasta (inclusive)"""
+        desde = desde.replace("/", "-")
+        hasta = hasta.replace("/", "-")
+        return bisect.bisect_left(self.fechas, desde), bisect.bisect_right(
+            self.fechas, hasta
+        )
+
+
+class StubConfig:
+    def __init__(
+        self,
+        rows: int = 10_000,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        username: str | None = None,
+        password: str | None = None,
+        seed: int = 0,
+    ):
+        self.dataset = Dataset(rows, seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.username = username
+        self.password = password
+        self.random = random.Random(seed)
+        self.sessions: set[str] = set()
+        self.lock = threading.Lock()
+        self.stats = {"login": 0, "paginas": 0, "errores": 0, "no_autorizado": 0}
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config: StubConfig
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - firma de la clase base
+        pass
+
+    def _cookies(self) -> dict:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return {k: v.value for k, v in cookie.items()}
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str = "application/json",
+        cookies: dict | None = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (cookies or {}).items():
+            self.send_header("Set-Cookie", f"{name}={value}; Path=/; HttpOnly")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, code: str, message: str) -> None:
+        body = json.dumps({"Error": {"Code": code, "Message": message}}).encode()
+        self._send(status, body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == RUTA_LOGIN:
+            token = secrets.token_hex(16)
+            html = LOGIN_HTML.format(token=token, ruta=RUTA_LOGIN, prefijo=PREFIJO)
+            self._send(200, html.encode(), "text/html", {COOKIE_CSRF: token})
+        elif path.rstrip("/") == PREFIJO:
+            if self._cookies().get(COOKIE_AUTH) in self.config.sessions:
+                self._send(200, b"<html><body>iTraffic</body></html>", "text/html")
+            else:
+                self.send_response(302)
+                self.send_header("Location", RUTA_LOGIN)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+        else:
+            self._error(404, "NotFound", path)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == RUTA_LOGIN:
+            self._login()
+        elif path == RUTA_DATA:
+            self._list()
+        else:
+            self._error(404, "NotFound", path)
+
+    def _login(self) -> None:
+        config = self.config
+        body = self._body()
+        csrf = self._cookies().get(COOKIE_CSRF)
+        if not csrf or self.headers.get("X-CSRF-TOKEN") != csrf:
+            self._error(400, "InvalidToken", "Falta el token anti-forgery")
+            return
+        if (config.username is not None and body.get("Username") != config.username) or (
+            config.password is not None and body.get("Password") != config.password
+        ):
+            self._error(400, "AuthenticationError", "Usuario o contraseña inválidos")
+            return
+
+        token = secrets.token_hex(24)
+        with config.lock:
+            config.sessions.add(token)
+        config.count("login")
+        self._send(200, b"{}", cookies={COOKIE_AUTH: token})
+
+    def _list(self) -> None:
+        config = self.config
+        body = self._body()
+        if config.latency:
+            time.sleep(config.latency)
+        if self._cookies().get(COOKIE_AUTH) not in config.sessions:
+            config.count("no_autorizado")
+            self._error(401, "NotAuthorized", "Sesión inválida")
+            return
+        with config.lock:
+            falla = config.random.random() < config.error_rate
+        if falla:
+            config.count("errores")
+            self._error(500, "ServerError", "Error simulado")
+            return
+
+        inicio, fin = config.dataset.window(
+            body.get("fec_Compdesde") or "0000-00-00",
+            body.get("fec_CompHasta") or "9999-99-99",
+        )
+        take = int(body.get("Take") or 0) or fin - inicio
+        skip = int(body.get("Skip") or 0)
+        desde = min(inicio + skip, fin)
+        entities = config.dataset.entities[desde : min(desde + take, fin)]
+        config.count("paginas")
+        response = {
+            "Entities": entities,
+            "TotalCount": fin - inicio,
+            "Skip": skip,
+            "Take": take,
+        }
+        self._send(200, json.dumps(response).encode())
+
+
+def serve(port: int = 0, **kwargs) -> tuple[ThreadingHTTPServer, StubConfig]:
+    """Arranca el servidor en un hilo; devuelve el servidor (ver server_address)"""
+    config = StubConfig(**kwargs)
+    handler = type("Handler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos por página")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, config = serve(
+        args.port,
+        rows=args.rows,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        username=args.username,
+        password=args.password,
+        seed=args.seed,
+    )
+    print(f"Stub de traffic en http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(config.stats)
+
+
+if __name__ == "__main__":
+    main()
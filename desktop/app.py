@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
+import multiprocessing
+import queue
 import sys
 import os
+import threading
+import traceback
 import requests
 
 # Agrega la carpeta raíz (Test) al sys.path
@@ -11,22 +15,47 @@ if BASE_DIR not in sys.path:
 
 from Pipeline.etl_traffic import main_traffic
 from Pipeline.etl_excel import main_excel
+from Pipeline.orquestador import full_refresh
+
+
+# Mensajes (tipo, texto) de los hilos de trabajo hacia la UI. Tk no se puede
+# tocar fuera de su hilo: poll_ui los vuelca con root.after()
+ui_queue: queue.Queue = queue.Queue()
 
 
 class ConsoleRedirect:
-    """Redirige stdout/stderr a un widget Text de tkinter"""
+    """Redirige stdout/stderr a la cola que vuelca poll_ui en la pestaña de logs"""
 
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
+    def __init__(self, cola):
+        self.cola = cola
 
     def write(self, msg):
-        self.text_widget.insert(tk.END, msg)
-        self.text_widget.see(tk.END)  # autoscroll al final
+        self.cola.put(("log", msg))
 
     def flush(self):
         pass  # necesario para compatibilidad con sys.stdout
 
 
+def poll_ui():
+    """Aplica en el hilo de Tk lo que mandaron los hilos de trabajo"""
+    while True:
+        try:
+            tipo, texto = ui_queue.get_nowait()
+        except queue.Empty:
+            break
+        if tipo == "log":
+            log_text.insert(tk.END, texto)
+            log_text.see(tk.END)  # autoscroll al final
+        elif tipo == "joke":
+            joke_label.config(text=texto)
+        else:
+            status_label.config(text=texto)
+            if tipo == "fin":
+                for btn in (btn1, btn2, btn3):
+                    btn.config(state="normal")
+    root.after(100, poll_ui)
+
+
 def joker() -> str:
     """Obtiene un chiste aleatorio desde la API"""
     try:
@@ -41,60 +70,85 @@ def joker() -> str:
     return "No se pudo obtener un chiste. Espera un momento..."
 
 
+def run_in_background(fn, mensaje: str):
+    """Corre `fn` en un hilo aparte para no congelar la ventana"""
+
+    def worker():
+        ui_queue.put(("joke", joker()))
+        try:
+            fn()
+            ui_queue.put(("fin", mensaje))
+        except Exception:
+            traceback.print_exc()
+            ui_queue.put(("fin", "❌ El proceso falló, revisar la pestaña Logs"))
+
+    for btn in (btn1, btn2, btn3):
+        btn.config(state="disabled")
+    status_label.config(text="⏳ Procesando...")
+    threading.Thread(target=worker, daemon=True).start()
+
+
 def run_traffic():
-    joke_text = joker()
-    joke_label.config(text=joke_text)
-    main_traffic()
-    status_label.config(text="✅ ETL-Traffic finalizado")
+    run_in_background(main_traffic, "✅ ETL-Traffic finalizado")
 
 
 def run_excel():
-    joke_text = joker()
-    joke_label.config(text=joke_text)  # Muestra el chiste en la pestaña
-    main_excel()
-    status_label.config(text="✅ Actualización finalizada")
+    run_in_background(main_excel, "✅ Actualización finalizada")
+
+
+def run_full():
+    run_in_background(full_refresh, "✅ Actualización completa finalizada")
+
+
+if __name__ == "__main__":
+    # En el .exe de PyInstaller los procesos del orquestador (etapa "workbook")
+    # relanzan este mismo ejecutable: sin esto abrirían otra ventana
+    multiprocessing.freeze_support()
 
+    # --- Ventana principal ---
+    root = tk.Tk()
+    root.title("Pipeline - TSA trips")
+    root.geometry("800x600")
 
-# --- Ventana principal ---
-root = tk.Tk()
-root.title("Pipeline - TSA trips")
-root.geometry("800x600")
+    notebook = ttk.Notebook(root)
+    notebook.pack(fill="both", expand=True)
 
-notebook = ttk.Notebook(root)
-notebook.pack(fill="both", expand=True)
+    # --- Pestaña 1: Botones ---
+    frame_buttons = ttk.Frame(notebook)
 
-# --- Pestaña 1: Botones ---
-frame_buttons = ttk.Frame(notebook)
+    btn1 = tk.Button(frame_buttons, text="ETL-Traffic", command=run_traffic)
+    btn1.pack(pady=10)
 
-btn1 = tk.Button(frame_buttons, text="ETL-Traffic", command=run_traffic)
-btn1.pack(pady=10)
+    btn2 = tk.Button(frame_buttons, text="Actualizar Excel", command=run_excel)
+    btn2.pack(pady=10)
 
-btn2 = tk.Button(frame_buttons, text="Actualizar Excel", command=run_excel)
-btn2.pack(pady=10)
+    btn3 = tk.Button(frame_buttons, text="Actualización completa", command=run_full)
+    btn3.pack(pady=10)
 
-status_label = tk.Label(frame_buttons, text="Esperando acción...")
-status_label.pack(pady=10)
+    status_label = tk.Label(frame_buttons, text="Esperando acción...")
+    status_label.pack(pady=10)
 
-joke_label = tk.Label(
-    frame_buttons,
-    text="",
-    wraplength=600,
-    justify="center",
-    font=("Arial", 12),
-    fg="blue",
-)
-joke_label.pack(pady=20)
+    joke_label = tk.Label(
+        frame_buttons,
+        text="",
+        wraplength=600,
+        justify="center",
+        font=("Arial", 12),
+        fg="blue",
+    )
+    joke_label.pack(pady=20)
 
-notebook.add(frame_buttons, text="Acciones")
+    notebook.add(frame_buttons, text="Acciones")
 
-# --- Pestaña 2: Consola ---
-frame_logs = ttk.Frame(notebook)
-log_text = scrolledtext.ScrolledText(frame_logs, wrap=tk.WORD, state="normal")
-log_text.pack(fill="both", expand=True)
-notebook.add(frame_logs, text="Logs")
+    # --- Pestaña 2: Consola ---
+    frame_logs = ttk.Frame(notebook)
+    log_text = scrolledtext.ScrolledText(frame_logs, wrap=tk.WORD, state="normal")
+    log_text.pack(fill="both", expand=True)
+    notebook.add(frame_logs, text="Logs")
 
-# Redirigimos stdout/stderr a la pestaña de logs
-sys.stdout = ConsoleRedirect(log_text)
-sys.stderr = ConsoleRedirect(log_text)
+    # Redirigimos stdout/stderr a la pestaña de logs
+    sys.stdout = ConsoleRedirect(ui_queue)
+    sys.stderr = ConsoleRedirect(ui_queue)
 
-root.mainloop()
+    root.after(100, poll_ui)
+    root.mainloop()